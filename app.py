@@ -1,141 +1,350 @@
-from dash import Dash, dcc, html, Output, Input, callback_context
+import gc
+import time
+from functools import lru_cache, partial
+
+from dash import Dash, dcc, html, Output, Input, State, ClientsideFunction, callback_context
 import sd_material_ui as sd
 
 from plots.bar_plots import plot_protein, plot_protein_ghg, plot_aquaculture_emissions
 from plots.line_plots import plot_avg_global_consumption, plot_sustainability, plot_fishing_type, plot_gdp_cons, \
     plot_aquaculture_production
-from plots.data import get_consumption, group_by_elements, get_population, get_industry_data, get_sustainability, \
-    get_fishing_types, get_gdp, get_protein, get_protein_ghg, get_aquaculture, get_aquaculture_emissions
-from plots.choropleth_maps import plot_consumption_map, plot_industry_map
-
-app = Dash(__name__)
+from plots.data import datasets, industry_elements, consumption_frames
+from plots.choropleth_maps import plot_consumption_map, plot_consumption_year, plot_industry_map, industry_map_modes, \
+    industry_mode_map
+from plots.figure_cache import prebuild
+from utils.metrics import timed, traced_callback, trace_callbacks, metrics_response
+from utils.compression import compress_responses
+from utils.config import industry_clientside, consumption_streaming, consumption_frame_batch, consumption_prefetch, \
+    response_compression, lazy_sections, lazy_margin, lazy_interval, eager_loading, figure_workers, colors, \
+    story_countries
+
+# Compression is handled by utils/compression.py instead of flask-compress
+app = Dash(__name__, compress=False, eager_loading=eager_loading)
 server = app.server
+server.add_url_rule('/metrics', 'metrics', metrics_response)
+# Flask runs after_request hooks last registered first, so the callback trace sees the compressed response
+trace_callbacks(server)
+if response_compression:
+    compress_responses(app)
 app.title = 'Fishing for sustainability'
 
 year = '2017'
-
-# Data
-df_consumption = get_consumption()
-df_sustainability = get_sustainability()
-df_fish_types = get_fishing_types()
-df_population = get_population()
-df_industry = get_industry_data()
-df_gdp = get_gdp()
-df_protein = get_protein()
-df_ghg = get_protein_ghg()
-df_aqua = get_aquaculture()
-df_aqua_emissions = get_aquaculture_emissions()
-
-industry_dict = {
-    'production': group_by_elements(df_industry, df_population, ['Production'], year),
-    'import': group_by_elements(df_industry, df_population, ['Import Quantity'], year),
-    'supply': group_by_elements(df_industry, df_population, ['Domestic supply quantity'], year),
-    'export': group_by_elements(df_industry, df_population, ['Export Quantity'], year)
+preloaded = False
+startup_timings = {}
+
+
+def plot_industry(key, industry_year=year):
+    return plot_industry_map(
+        datasets['industry_cube'].slice(industry_elements[key], industry_year).reset_index(),
+        title=f"{key.capitalize()} for year {industry_year}"
+    )
+
+
+def plot_industry_mode(key):
+    """ The map of an element the clientside callback starts from, over every country of the cube """
+    return industry_mode_map(datasets['industry_cube'], key, industry_elements[key], year)
+
+
+@lru_cache(maxsize=None)
+def industry_modes():
+    return industry_map_modes(datasets['industry_cube'], industry_elements, year)
+
+
+def industry_year_slider():
+    years = datasets['industry_cube'].years
+    return dcc.Slider(id='industry-year',
+                      min=int(years.min()),
+                      max=int(years.max()),
+                      step=1,
+                      value=int(year),
+                      marks={int(industry_year): str(industry_year) for industry_year in years})
+
+
+def industry_map():
+    """ Initial industry map. In server mode the callback replaces it on page load. """
+    if industry_clientside:
+        return industry_modes()[0]
+    return plot_sustainability(datasets['sustainability'])
+
+
+def consumption_figure():
+    """ The animated consumption map, or in streaming mode its first year """
+    if not consumption_streaming:
+        return plot_consumption_map(datasets['consumption'])
+    df = datasets['consumption_by_year']
+    return plot_consumption_year(df, int(df.columns.min()))
+
+
+def consumption_map():
+    """ The animated consumption map, or in streaming mode the first year with its own slider and play button """
+    if not consumption_streaming:
+        return dcc.Graph(
+            id='fish-tab-consumption',
+            figure=consumption_figure())
+
+    df = datasets['consumption_by_year']
+    first, last = int(df.columns.min()), int(df.columns.max())
+
+    return html.Div(className='consumption-container', children=[
+        dcc.Graph(
+            id='fish-tab-consumption',
+            figure=consumption_figure()),
+        html.Div(className='consumption-controls', children=[
+            sd.Button('Play',
+                      className='button',
+                      id='consumption-play',
+                      variant='outlined',
+                      n_clicks=0),
+            html.Div(className='consumption-slider', children=[
+                dcc.Slider(id='consumption-year',
+                           min=first,
+                           max=last,
+                           step=1,
+                           value=first,
+                           marks={year: str(year) for year in range(first, last + 1, 10)},
+                           tooltip={'placement': 'top', 'always_visible': True})
+            ]),
+        ]),
+        dcc.Interval(id='consumption-interval', interval=300, disabled=True),
+        dcc.Store(id='consumption-frame-config', data={'min': first,
+                                                       'max': last,
+                                                       'batch': consumption_frame_batch,
+                                                       'prefetch': consumption_prefetch}),
+        dcc.Store(id='consumption-frame-request'),
+        dcc.Store(id='consumption-frame-batch', data=consumption_frames(first, consumption_frame_batch)),
+    ])
+
+
+def fishing_types_id(country):
+    return f"{country.lower().replace(' ', '-')}-fishing-types"
+
+
+def fishing_types_figure(country):
+    return plot_fishing_type(datasets['fishing_type_entities'].select(country), country)
+
+
+# Figures of the story sections below the maps, built into the layout or in lazy mode when they approach the viewport
+section_figures = {
+    'fish-tab-trend': lambda: plot_avg_global_consumption(datasets['consumption']),
+    'fish-tab-overfishing': lambda: plot_sustainability(datasets['sustainability']),
+    'gdp-consumption-plot': lambda: plot_gdp_cons(datasets['gdp_entities'].select(*story_countries),
+                                                  datasets['consumption'], datasets['gdp_consumption_trends']),
+    'protein-emissions-plot': lambda: plot_protein_ghg(datasets['protein_ghg']),
+    'protein-intake-plot': lambda: plot_protein(datasets['protein_entities'].select(*story_countries)),
+    **{fishing_types_id(country): partial(fishing_types_figure, country) for country in story_countries},
+    'aquaculture-capture-production-plot': lambda: plot_aquaculture_production(
+        datasets['aquaculture_entities'].select(*story_countries)),
+    'aquaculture-emissions-plot': lambda: plot_aquaculture_emissions(datasets['aquaculture_emissions']),
 }
 
 
+def placeholder_figure():
+    """ An empty figure in the page colors, holding the place of a section figure until it is loaded """
+    return {
+        'data': [],
+        'layout': {
+            'paper_bgcolor': colors['background'],
+            'plot_bgcolor': colors['background'],
+            'xaxis': {'visible': False},
+            'yaxis': {'visible': False}
+        }
+    }
+
+
+def section_figure(graph_id):
+    if lazy_sections:
+        return placeholder_figure()
+    return section_figures[graph_id]()
+
+
+def layout_figures():
+    """
+    Every figure in the layout and the industry map variants by name, see figure_cache.prebuild.
+    The variants are those the page renders, the maps of industry_modes in clientside mode.
+
+    """
+    builders = {'fish-tab-consumption': consumption_figure, **section_figures}
+    for key in industry_elements:
+        builders[f'industry-{key}'] = partial(plot_industry_mode if industry_clientside else plot_industry, key)
+    return builders
+
+
+def lazy_section_components():
+    """ The visibility poll and one store per section figure that flips when the figure nears the viewport """
+    if not lazy_sections:
+        return []
+
+    return [
+        dcc.Interval(id='lazy-interval', interval=lazy_interval),
+        dcc.Store(id='lazy-config', data={'ids': list(section_figures), 'margin': lazy_margin}),
+        *[dcc.Store(id=f'{graph_id}-visible') for graph_id in section_figures],
+    ]
+
+
 # Callbacks
-@app.callback(
-    Output('fish-tab-industry', 'figure'),
-    Input('btn-production', 'n_clicks'),
-    Input('btn-import', 'n_clicks'),
-    Input('btn-export', 'n_clicks'),
-    Input('btn-supply', 'n_clicks'),
-)
-def animate_fish_industry_maps(btn1, btn2, btn3, btn4):
+def animate_fish_industry_maps(btn1, btn2, btn3, btn4, industry_year, key):
     changed_id = [p['prop_id'] for p in callback_context.triggered][0]
 
     if 'btn-import' in changed_id:
-        # Default to production
-        plot = plot_industry_map(
-            industry_dict['import'].reset_index(),
-            title="Import for year 2017"
-        )
+        key = 'import'
     elif 'btn-export' in changed_id:
-        # Default to production
-        plot = plot_industry_map(
-            industry_dict['export'].reset_index(),
-            title="Export for year 2017"
-        )
+        key = 'export'
     elif 'btn-supply' in changed_id:
-        # Default to production
-        plot = plot_industry_map(
-            industry_dict['supply'].reset_index(),
-            title="Supply for year 2017"
-        )
-    else:
-        # Default to production
-        plot = plot_industry_map(
-            industry_dict['production'].reset_index(),
-            title="Production for year 2017"
-        )
-    return plot
-
-
-app.layout = html.Div(className='main', children=[
-    html.Div(className='navbar',
-             children=[
-                 html.Ul([
-                     html.Li(html.A('Conclusion', href='#conclusion')),
-                     html.Li(html.A('Aquaculture Emissions', href='#aquaculture-emissions')),
-                     html.Li(html.A('Aquaculture and Capture production', href='#aquaculture-capture-production')),
-                     html.Li(html.A('Fishing Methods', href='#fishing-types')),
-                     html.Li(html.A('Protein Intake', href='#protein-intake')),
-                     html.Li(html.A('Consumption and GDP', href='#gdp-consumption')),
-                     html.Li(html.A('Introduction', href='#introduction')),
-                 ])
-             ]),
-
-    html.Div(id='title',
-             children=[
-                 html.H1(
-                     children='Fishing for sustainability',
-                     className='title fade-left'
-                 ),
-                 html.H2(
-                     children='A story on the best and worst fisheries of the world',
-                     className='text-subtitle fade-left'
-                 ),
-                 html.Div(
-                     className='contact-info fade-left',
-                     children=[
-                         html.H4(
-                             'By: Niels Jansen (s217149), Yufan Du (s210356), and Simon Moe Sørensen (s174420)',
-                             style={
-                                 'color': 'var(--text-secondary-color-dark)'
-                             }
-                         ),
-                         html.A(
-                             html.Img(
-                                 src='./assets/github-icon.png',
-                                 style={
-                                     'width': '25px',
-                                     'height': '25px',
-                                 }),
-                             target='_blank',
-                             href='https://github.com/simonmoesorensen/socialdata-overfishing',
-                             style={
-                                 'marginLeft': '1rem'
-                             })
-                     ])
+        key = 'supply'
+    elif 'btn-production' in changed_id:
+        key = 'production'
+    # Otherwise the year changed, keep the current map
+    return plot_industry(key, industry_year), key
+
 
-             ]),
-    html.Div(
-        id='introduction',
-        style={'marginTop': '5rem'},
-        children=[
-            dcc.Tabs(parent_className='fade-left flex-0',
-                     children=[
-                         dcc.Tab(label='Consumption',
-                                 className='custom-tab fade-up',
-                                 selected_className='custom-tab--selected',
-                                 children=[
-                                     html.Div(className='two-column', children=[
-                                         dcc.Graph(
-                                             id='fish-tab-consumption',
-                                             figure=plot_consumption_map(df_consumption)),
-                                         dcc.Markdown(className='text-box',
-                                                      children="""
+industry_outputs = [
+    Output('fish-tab-industry', 'figure'),
+    Output('industry-key', 'data'),
+]
+
+industry_inputs = [
+    Input('btn-production', 'n_clicks'),
+    Input('btn-import', 'n_clicks'),
+    Input('btn-export', 'n_clicks'),
+    Input('btn-supply', 'n_clicks'),
+    Input('industry-year', 'value'),
+    State('industry-key', 'data'),
+]
+
+if industry_clientside:
+    app.clientside_callback(
+        ClientsideFunction(namespace='industry', function_name='switch_mode'),
+        *industry_outputs,
+        *industry_inputs,
+        State('industry-modes', 'data'),
+        State('fish-tab-industry', 'figure'),
+    )
+else:
+    app.callback(*industry_outputs, *industry_inputs)(timed('callback')(traced_callback(animate_fish_industry_maps)))
+
+
+def load_consumption_frames(request):
+    return consumption_frames(request['start'], consumption_frame_batch)
+
+
+if consumption_streaming:
+    app.clientside_callback(
+        ClientsideFunction(namespace='consumption', function_name='show_year'),
+        Output('fish-tab-consumption', 'figure'),
+        Output('consumption-frame-request', 'data'),
+        Input('consumption-year', 'value'),
+        Input('consumption-frame-batch', 'data'),
+        State('consumption-frame-config', 'data'),
+        State('fish-tab-consumption', 'figure'),
+    )
+    app.clientside_callback(
+        ClientsideFunction(namespace='consumption', function_name='play'),
+        Output('consumption-year', 'value'),
+        Output('consumption-interval', 'disabled'),
+        Output('consumption-play', 'children'),
+        Input('consumption-play', 'n_clicks'),
+        Input('consumption-interval', 'n_intervals'),
+        State('consumption-year', 'value'),
+        State('consumption-interval', 'disabled'),
+        State('consumption-frame-config', 'data'),
+        prevent_initial_call=True
+    )
+    app.callback(
+        Output('consumption-frame-batch', 'data'),
+        Input('consumption-frame-request', 'data'),
+        prevent_initial_call=True
+    )(timed('callback')(traced_callback(load_consumption_frames)))
+
+
+def load_section_figure(graph_id):
+    def load_figure(visible):
+        return section_figures[graph_id]()
+
+    load_figure.__name__ = f"load_{graph_id.replace('-', '_')}"
+    return load_figure
+
+
+if lazy_sections:
+    app.clientside_callback(
+        ClientsideFunction(namespace='lazy', function_name='reveal'),
+        *[Output(f'{graph_id}-visible', 'data') for graph_id in section_figures],
+        Output('lazy-interval', 'disabled'),
+        Input('lazy-interval', 'n_intervals'),
+        State('lazy-config', 'data'),
+    )
+    for graph_id in section_figures:
+        app.callback(
+            Output(graph_id, 'figure'),
+            Input(f'{graph_id}-visible', 'data'),
+            prevent_initial_call=True
+        )(timed('callback')(traced_callback(load_section_figure(graph_id))))
+
+
+@lru_cache(maxsize=None)
+@timed('layout')
+def serve_layout():
+    return html.Div(className='main', children=[
+        html.Div(className='navbar',
+                 children=[
+                     html.Ul([
+                         html.Li(html.A('Conclusion', href='#conclusion')),
+                         html.Li(html.A('Aquaculture Emissions', href='#aquaculture-emissions')),
+                         html.Li(html.A('Aquaculture and Capture production', href='#aquaculture-capture-production')),
+                         html.Li(html.A('Fishing Methods', href='#fishing-types')),
+                         html.Li(html.A('Protein Intake', href='#protein-intake')),
+                         html.Li(html.A('Consumption and GDP', href='#gdp-consumption')),
+                         html.Li(html.A('Introduction', href='#introduction')),
+                     ])
+                 ]),
+
+        html.Div(id='title',
+                 children=[
+                     html.H1(
+                         children='Fishing for sustainability',
+                         className='title fade-left'
+                     ),
+                     html.H2(
+                         children='A story on the best and worst fisheries of the world',
+                         className='text-subtitle fade-left'
+                     ),
+                     html.Div(
+                         className='contact-info fade-left',
+                         children=[
+                             html.H4(
+                                 'By: Niels Jansen (s217149), Yufan Du (s210356), and Simon Moe Sørensen (s174420)',
+                                 style={
+                                     'color': 'var(--text-secondary-color-dark)'
+                                 }
+                             ),
+                             html.A(
+                                 html.Img(
+                                     src='./assets/github-icon.png',
+                                     style={
+                                         'width': '25px',
+                                         'height': '25px',
+                                     }),
+                                 target='_blank',
+                                 href='https://github.com/simonmoesorensen/socialdata-overfishing',
+                                 style={
+                                     'marginLeft': '1rem'
+                                 })
+                         ])
+
+                 ]),
+        html.Div(
+            id='introduction',
+            style={'marginTop': '5rem'},
+            children=[
+                dcc.Tabs(parent_className='fade-left flex-0',
+                         children=[
+                             dcc.Tab(label='Consumption',
+                                     className='custom-tab fade-up',
+                                     selected_className='custom-tab--selected',
+                                     children=[
+                                         html.Div(className='two-column', children=[
+                                             consumption_map(),
+                                             dcc.Markdown(className='text-box',
+                                                          children="""
 # Consumption
 
 By clicking `Play` on the map to the left, you will see a video of how the consumption of fish has developed from 1961 to 2017.
@@ -149,19 +358,19 @@ We have chosen to focus primarily on **Norway** and **China** as representatives
 East Pacific region respectively. This is due to the size of the country concerning neighbouring countries, which
 leads to a higher absolute impact on the fishing industry. 
                                                   """)
-                                     ])
-                                 ]),
-                         dcc.Tab(label='Trend',
-                                 className='custom-tab',
-                                 selected_className='custom-tab--selected',
-                                 children=[
-                                     html.Div(className='two-column', children=[
-                                         dcc.Loading(dcc.Graph(
-                                             id='fish-tab-trend',
-                                             figure=plot_avg_global_consumption(df_consumption)
-                                         )),
-                                         dcc.Markdown(className='text-box',
-                                                      children="""
+                                         ])
+                                     ]),
+                             dcc.Tab(label='Trend',
+                                     className='custom-tab',
+                                     selected_className='custom-tab--selected',
+                                     children=[
+                                         html.Div(className='two-column', children=[
+                                             dcc.Loading(dcc.Graph(
+                                                 id='fish-tab-trend',
+                                                 figure=section_figure('fish-tab-trend')
+                                             )),
+                                             dcc.Markdown(className='text-box',
+                                                          children="""
 # Trend
 
 Around the 1960s-1970s our fish consumption was near the recommended amount and since then 
@@ -170,19 +379,19 @@ This coupled with the fact that our global population has more than doubled in t
 As a result, it's not surprising that the amount of overexploited fishing is drastically increasing, 
 being made possible by the technological advancements over the last decades.
                                                       """)
-                                     ])
-                                 ]),
-                         dcc.Tab(label='Overfishing',
-                                 className='custom-tab',
-                                 selected_className='custom-tab--selected',
-                                 children=[
-                                     html.Div(className='two-column', children=[
-                                         dcc.Loading(dcc.Graph(
-                                             id='fish-tab-overfishing',
-                                             figure=plot_sustainability(df_sustainability)
-                                         )),
-                                         dcc.Markdown(className='text-box',
-                                                      children="""
+                                         ])
+                                     ]),
+                             dcc.Tab(label='Overfishing',
+                                     className='custom-tab',
+                                     selected_className='custom-tab--selected',
+                                     children=[
+                                         html.Div(className='two-column', children=[
+                                             dcc.Loading(dcc.Graph(
+                                                 id='fish-tab-overfishing',
+                                                 figure=section_figure('fish-tab-overfishing')
+                                             )),
+                                             dcc.Markdown(className='text-box',
+                                                          children="""
 # Overfishing
 
 Every year that we overexploit an ocean, the fish population decreases. 
@@ -191,63 +400,73 @@ amount of fish as we did the year prior, we would now be overexploiting the ocea
 population significantly since a decreased population of fish also leads to a decrease of the amount that can naturally 
 be replenished. Thus it is a negative feedback loop. 
                                                       """)
-                                     ])
-                                 ]),
-                         dcc.Tab(label='Industry',
-                                 className='custom-tab',
-                                 selected_className='custom-tab--selected',
-                                 children=[
-                                     html.Div(className='two-column', children=[
-                                         dcc.Loading(
-                                             html.Div(className='industry-container',
-                                                      children=[
-                                                          dcc.Graph(
-                                                              id='fish-tab-industry',
-                                                              figure=plot_sustainability(df_sustainability)),
-                                                          html.Div(className='button-array',
-                                                                   style={'gap': '1rem',
-                                                                          'marginTop': '1rem'},
-                                                                   children=[
-                                                                       sd.Button('Production',
-                                                                                 className='button',
-                                                                                 id='btn-production',
-                                                                                 variant='outlined',
-                                                                                 n_clicks=0,
-                                                                                 style={
-                                                                                     'background-color': 'cornflowerblue',
-                                                                                     'color': 'var(--text-color-dark)'
-                                                                                 }),
-                                                                       sd.Button('Supply',
-                                                                                 className='button',
-                                                                                 id='btn-supply',
-                                                                                 variant='outlined',
-                                                                                 n_clicks=0,
-                                                                                 style={
-                                                                                     'background-color': 'forestgreen',
-                                                                                     'color': 'var(--text-color-dark)'
-                                                                                 }),
-                                                                       sd.Button('Import',
-                                                                                 className='button',
-                                                                                 id='btn-import',
-                                                                                 variant='outlined',
-                                                                                 n_clicks=0,
-                                                                                 style={
-                                                                                     'background-color': 'indianred',
-                                                                                     'color': 'var(--text-color-dark)'
-                                                                                 }),
-                                                                       sd.Button('Export',
-                                                                                 className='button',
-                                                                                 id='btn-export',
-                                                                                 variant='outlined',
-                                                                                 n_clicks=0,
-                                                                                 style={
-                                                                                     'background-color': 'rebeccapurple',
-                                                                                     'color': 'var(--text-color-dark)'
-                                                                                 }),
-                                                                   ])
-                                                      ])),
-                                         dcc.Markdown(className='text-box',
-                                                      children="""
+                                         ])
+                                     ]),
+                             dcc.Tab(label='Industry',
+                                     className='custom-tab',
+                                     selected_className='custom-tab--selected',
+                                     children=[
+                                         html.Div(className='two-column', children=[
+                                             dcc.Loading(
+                                                 html.Div(className='industry-container',
+                                                          children=[
+                                                              dcc.Graph(
+                                                                  id='fish-tab-industry',
+                                                                  figure=industry_map()),
+                                                              dcc.Store(
+                                                                  id='industry-modes',
+                                                                  data=industry_modes()[1] if industry_clientside else None),
+                                                              dcc.Store(
+                                                                  id='industry-key',
+                                                                  data='production'),
+                                                              html.Div(className='button-array',
+                                                                       style={'gap': '1rem',
+                                                                              'marginTop': '1rem'},
+                                                                       children=[
+                                                                           sd.Button('Production',
+                                                                                     className='button',
+                                                                                     id='btn-production',
+                                                                                     variant='outlined',
+                                                                                     n_clicks=0,
+                                                                                     style={
+                                                                                         'background-color': 'cornflowerblue',
+                                                                                         'color': 'var(--text-color-dark)'
+                                                                                     }),
+                                                                           sd.Button('Supply',
+                                                                                     className='button',
+                                                                                     id='btn-supply',
+                                                                                     variant='outlined',
+                                                                                     n_clicks=0,
+                                                                                     style={
+                                                                                         'background-color': 'forestgreen',
+                                                                                         'color': 'var(--text-color-dark)'
+                                                                                     }),
+                                                                           sd.Button('Import',
+                                                                                     className='button',
+                                                                                     id='btn-import',
+                                                                                     variant='outlined',
+                                                                                     n_clicks=0,
+                                                                                     style={
+                                                                                         'background-color': 'indianred',
+                                                                                         'color': 'var(--text-color-dark)'
+                                                                                     }),
+                                                                           sd.Button('Export',
+                                                                                     className='button',
+                                                                                     id='btn-export',
+                                                                                     variant='outlined',
+                                                                                     n_clicks=0,
+                                                                                     style={
+                                                                                         'background-color': 'rebeccapurple',
+                                                                                         'color': 'var(--text-color-dark)'
+                                                                                     }),
+                                                                       ]),
+                                                              html.Div(className='industry-year',
+                                                                       children=[
+                                                                           industry_year_slider()
+                                                                       ])
+                                                          ])),
+                                             dcc.Markdown(className='text-box',
+                                                          children="""
 # Industry 
 
 _Try clicking the buttons on the left_
@@ -274,15 +493,15 @@ The countries we will be looking at are Norway and China. Since these are the co
 self-produced, which also have significant cultural and geographical differences.
                                                                        """)
 
-                                     ])
-                                 ]),
-                     ]),
-        ]),
+                                         ])
+                                     ]),
+                         ]),
+            ]),
 
-    html.Div(className='two-row fade-right',
-             style={'marginTop': '1rem'},
-             children=[
-                 dcc.Markdown(className="text-box", children="""
+        html.Div(className='two-row fade-right',
+                 style={'marginTop': '1rem'},
+                 children=[
+                     dcc.Markdown(className="text-box", children="""
 # Introduction
 Fishing has been the most important industry for human beings since ancient times, including marine fisheries, freshwater fisheries, 
 capture fisheries and aquaculture fisheries. Seafood is also one of the most common foods, such as fish and shrimp [[7]](https://www.globalseafood.org/advocate/seafoods-newfound-retail-popularity-has-a-permanent-feel-to-it/). 
@@ -307,18 +526,18 @@ sustainable fishing by comparing these two countries and find out where China's
 More interestingly, we found the advantage of seafood as a protein intake, and to maximize this advantage, 
 sustainable fishing activities become more important. 
 """),
-             ]),
-    #######################################################################
-    ###                      GDP and Consumption                       ####
-    #######################################################################
+                 ]),
+        #######################################################################
+        ###                      GDP and Consumption                       ####
+        #######################################################################
 
-    html.H2('Consumption and GDP',
-            id='gdp-consumption',
-            className='title-medium'),
+        html.H2('Consumption and GDP',
+                id='gdp-consumption',
+                className='title-medium'),
 
-    html.Div(className='two-column', children=[
-        dcc.Markdown(className="text-box",
-                     children="""
+        html.Div(className='two-column', children=[
+            dcc.Markdown(className="text-box",
+                         children="""
 We've already established that the average person nowadays eats about twice as much 
 fish as they did 60 years ago (Trend) and the reason we eat this much fish is simple, 
 it's healthy and delicious. But that begs the question, why didn't we eat this much fish 
@@ -355,25 +574,25 @@ overexploiting marine life and are increasing global greenhouse gas (GHG) emissi
 growth? 
 
             """),
-        dcc.Graph(id='gdp-consumption-plot',
-                  figure=plot_gdp_cons(df_gdp, df_consumption))
-    ]),
-
-    #######################################################################
-    ###                         Protein Intake                         ####
-    #######################################################################
-
-    html.H2('Protein Intake',
-            id='protein-intake',
-            className='title-medium'),
-
-    html.Div(className='two-column',
-             style={'marginTop': '2rem'},
-             children=[
-                 dcc.Graph(id='protein-emissions-plot',
-                           figure=plot_protein_ghg(df_ghg)),
-                 dcc.Markdown(className='text-box',
-                              children="""
+            dcc.Graph(id='gdp-consumption-plot',
+                      figure=section_figure('gdp-consumption-plot'))
+        ]),
+
+        #######################################################################
+        ###                         Protein Intake                         ####
+        #######################################################################
+
+        html.H2('Protein Intake',
+                id='protein-intake',
+                className='title-medium'),
+
+        html.Div(className='two-column',
+                 style={'marginTop': '2rem'},
+                 children=[
+                     dcc.Graph(id='protein-emissions-plot',
+                               figure=section_figure('protein-emissions-plot')),
+                     dcc.Markdown(className='text-box',
+                                  children="""
 ## Greenhouse Gas Emissions
 
 Human behaviours are causing several global 
@@ -398,17 +617,17 @@ therefore being a better way to get enough nutrition sustainably. More seafood a
 being more environmentally friendly. 
 
 """
-                              ),
-             ]),
+                                  ),
+                 ]),
 
-    dcc.Graph(id='protein-intake-plot',
-              className='graph-wide',
-              style={'marginTop': '2rem'},
-              figure=plot_protein(df_protein),
-              responsive=True),
+        dcc.Graph(id='protein-intake-plot',
+                  className='graph-wide',
+                  style={'marginTop': '2rem'},
+                  figure=section_figure('protein-intake-plot'),
+                  responsive=True),
 
-    dcc.Markdown(className="text-box",
-                 children="""
+        dcc.Markdown(className="text-box",
+                     children="""
 ## Distribution of protein sources 
  
 Seafood contains a high-quality protein that includes 
@@ -430,18 +649,18 @@ the ineffective current fishing practices.
 
             """),
 
-    #######################################################################
-    ###                          Fishing Methods                         ####
-    #######################################################################
+        #######################################################################
+        ###                          Fishing Methods                         ####
+        #######################################################################
 
-    html.H2('Fishing Methods',
-            id='fishing-types',
-            className='title-medium'),
+        html.H2('Fishing Methods',
+                id='fishing-types',
+                className='title-medium'),
 
-    html.Div(className='two-column', children=[
-        html.Div(className='two-row', children=[
-            dcc.Markdown(className="text-box",
-                         children="""
+        html.Div(className='two-column', children=[
+            html.Div(className='two-row', children=[
+                dcc.Markdown(className="text-box",
+                             children="""
 # Fishing methods 
 
 There are a lot of ways to catch fish around the world. 
@@ -474,29 +693,28 @@ the methods they use need improvements, however, there is one more fishing indus
 aquaculture. 
         
         """),
-        ]),
-        html.Div(className='two-row', children=[
-            dcc.Graph(id='china-fishing-types',
-                      figure=plot_fishing_type(df_fish_types, 'China')),
-            dcc.Graph(id='norway-fishing-types',
-                      figure=plot_fishing_type(df_fish_types, 'Norway')),
-        ]),
+            ]),
+            html.Div(className='two-row', children=[
+                dcc.Graph(id=fishing_types_id(country),
+                          figure=section_figure(fishing_types_id(country)))
+                for country in story_countries
+            ]),
 
-    ]),
+        ]),
 
-    #######################################################################
-    ###                Aquaculture and capture production              ####
-    #######################################################################
+        #######################################################################
+        ###                Aquaculture and capture production              ####
+        #######################################################################
 
-    html.H2('Aquaculture and Capture production',
-            id='aquaculture-capture-production',
-            className='title-medium'),
+        html.H2('Aquaculture and Capture production',
+                id='aquaculture-capture-production',
+                className='title-medium'),
 
-    html.Div(className='two-column', children=[
-        dcc.Graph(id='aquaculture-capture-production-plot',
-                  figure=plot_aquaculture_production(df_aqua)),
-        dcc.Markdown(className="text-box",
-                     children="""
+        html.Div(className='two-column', children=[
+            dcc.Graph(id='aquaculture-capture-production-plot',
+                      figure=section_figure('aquaculture-capture-production-plot')),
+            dcc.Markdown(className="text-box",
+                         children="""
 
 The growing issue of overfishing has allowed the rapid growth of the aquaculture, or fish farming, industry over the 
 last decades as can be seen in the figures. Fish produced from farming activities currently accounts for over 
@@ -539,18 +757,18 @@ over capture production.
 
 
         """)
-    ]),
-    #######################################################################
-    ###                     Aquaculture emissions                      ####
-    #######################################################################
+        ]),
+        #######################################################################
+        ###                     Aquaculture emissions                      ####
+        #######################################################################
 
-    html.H2('Aquaculture Emissions',
-            id='aquaculture-emissions',
-            className='title-medium'),
+        html.H2('Aquaculture Emissions',
+                id='aquaculture-emissions',
+                className='title-medium'),
 
-    html.Div(className='two-column', children=[
-        dcc.Markdown(className="text-box",
-                     children="""
+        html.Div(className='two-column', children=[
+            dcc.Markdown(className="text-box",
+                         children="""
 
 We've already established that fish and other aquatic foods (blue foods) are an effective way of reaching a 
 sustainable diet. As the graph shows GHG emissions, as well as other environmental stressors, of most blue food 
@@ -575,18 +793,18 @@ main problem to tackle while expanding is making sure new inventions are not bey
 producers. 
  
    """),
-        dcc.Graph(id='aquaculture-emissions-plot',
-                  figure=plot_aquaculture_emissions(df_aqua_emissions))
-    ]),
+            dcc.Graph(id='aquaculture-emissions-plot',
+                      figure=section_figure('aquaculture-emissions-plot'))
+        ]),
 
-    html.H2('Conclusion',
-            className='title-medium',
-            id='conclusion'),
+        html.H2('Conclusion',
+                className='title-medium',
+                id='conclusion'),
 
-    dcc.Markdown(
-        className='text-box',
-        children=
-        """
+        dcc.Markdown(
+            className='text-box',
+            children=
+            """
 We have shown that the global interest in fish and seafood follows a positive trend of 0.12 kg/capita/year which
 leads to an increased environmental impact by the fishing industry, more so than ever before. In relation to this
 we have also shown that fish are getting overexploited by 35% and is still on the rise.
@@ -613,15 +831,15 @@ of GHG emissions. Especially for Seaweed and Bivalves that can be used as "filte
 they produce.
 
         """
-    ),
+        ),
 
-    html.H2('References',
-            className='title-medium',
-            id='references',
-            style={'marginBottom': 0}),
+        html.H2('References',
+                className='title-medium',
+                id='references',
+                style={'marginBottom': 0}),
 
-    dcc.Markdown(
-        """
+        dcc.Markdown(
+            """
         
 [1] Nestle, M., Wing, R., Birch, L., DiSogra, L., Drewnowski, A., Middleton, S., ... & Economos, C. (1998). Behavioral and social influences on food choice.
 
@@ -647,9 +865,86 @@ they produce.
 
 [12] Hannah ritchie, & Max roser. (2021, October). Fish and Overfishing. https://ourworldindata.org/fish-and-overfishing
         """
-    ),
+        ),
+
+        *lazy_section_components(),
+    ])
+
+
+def validation_layout():
+    """
+    Every component the callbacks use, without figures or data. Dash validates the callback ids against it
+    instead of calling the layout function as soon as it is assigned.
+
+    """
+    return html.Div([
+        dcc.Graph(id='fish-tab-consumption'),
+        sd.Button(id='consumption-play'),
+        dcc.Slider(id='consumption-year'),
+        dcc.Interval(id='consumption-interval'),
+        dcc.Store(id='consumption-frame-config'),
+        dcc.Store(id='consumption-frame-request'),
+        dcc.Store(id='consumption-frame-batch'),
+        dcc.Graph(id='fish-tab-industry'),
+        dcc.Store(id='industry-modes'),
+        dcc.Store(id='industry-key'),
+        *[sd.Button(id=f'btn-{key}') for key in industry_elements],
+        dcc.Slider(id='industry-year'),
+        *[dcc.Graph(id=graph_id) for graph_id in section_figures],
+        *lazy_section_components(),
+    ])
+
+
+def clear_layout_caches(names):
+    """ The layout and the industry modes are built from the datasets, rebuild them once any is reloaded """
+    serve_layout.cache_clear()
+    industry_modes.cache_clear()
+
+
+datasets.invalidated.append(clear_layout_caches)
+
+app.validation_layout = validation_layout()
+app.layout = serve_layout
+
+
+def ready():
+    """ Ready once preloaded, or under servers that do not preload, like python app.py, once the layout is built """
+    if preloaded or serve_layout.cache_info().currsize:
+        return 'ready', 200
+    return 'preloading', 503
+
+
+server.add_url_rule('/ready', 'ready', ready)
+
+
+def preload():
+    """
+    Load every dataset and build the layout before gunicorn forks its workers, see gunicorn.conf.py.
+    The datasets are then stored as categoricals and everything allocated so far is moved out of reach
+    of the garbage collector, so the workers keep sharing these pages instead of copying them.
+
+    """
+    global preloaded, startup_timings
+    if preloaded:
+        return 0
+
+    start = time.perf_counter()
+    startup_timings = datasets.preload()
+    if figure_workers != 1:
+        prebuild(figure_workers)
+    serve_layout()
+    if industry_clientside:
+        industry_modes()
+    if lazy_sections:
+        for build in section_figures.values():
+            build()
+    datasets.categorize()
+
+    gc.collect()
+    gc.freeze()
+    preloaded = True
+    return time.perf_counter() - start
 
-])
 
 if __name__ == '__main__':
     app.run_server(debug=True)
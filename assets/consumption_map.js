@@ -0,0 +1,54 @@
+(function () {
+    /* Years fetched so far, keyed by year, and years already asked for */
+    const frames = {};
+    const requested = new Set();
+
+    window.dash_clientside = Object.assign({}, window.dash_clientside, {
+        consumption: {
+            /* Show the selected year and ask the server for the next years that are not loaded yet */
+            show_year: function (year, batch, config, figure) {
+                const no_update = window.dash_clientside.no_update;
+                Object.assign(frames, batch || {});
+
+                let figure_update = no_update;
+                if (frames[year] && figure) {
+                    const trace = Object.assign({}, figure.data[0], {z: frames[year]});
+                    figure_update = Object.assign({}, figure, {data: [trace]});
+                }
+
+                let request = no_update;
+                for (let y = year; y <= Math.min(year + config.prefetch, config.max); y++) {
+                    if (!(y in frames) && !requested.has(y)) {
+                        for (let b = y; b < y + config.batch; b++) {
+                            requested.add(b);
+                        }
+                        request = {start: y};
+                        break;
+                    }
+                }
+                return [figure_update, request];
+            },
+
+            /* Play and pause, the interval only advances to years that are already loaded */
+            play: function (n_clicks, n_intervals, year, paused, config) {
+                const no_update = window.dash_clientside.no_update;
+                const triggered = window.dash_clientside.callback_context.triggered.map(t => t.prop_id).join(' ');
+
+                if (triggered.includes('consumption-play')) {
+                    if (paused) {
+                        return [year >= config.max ? config.min : no_update, false, 'Pause'];
+                    }
+                    return [no_update, true, 'Play'];
+                }
+
+                if (year >= config.max) {
+                    return [no_update, true, 'Play'];
+                }
+                if (!frames[year + 1]) {
+                    return [no_update, no_update, no_update];
+                }
+                return [year + 1, no_update, no_update];
+            }
+        }
+    });
+})();
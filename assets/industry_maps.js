@@ -0,0 +1,27 @@
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    industry: {
+        /* Swap the industry map values in place, the geometry is shipped once with the initial figure */
+        switch_mode: function (production, imports, exports, supply, year, key, modes, figure) {
+            const triggered = window.dash_clientside.callback_context.triggered.map(t => t.prop_id).join(' ');
+
+            if (triggered.includes('btn-import')) {
+                key = 'import';
+            } else if (triggered.includes('btn-export')) {
+                key = 'export';
+            } else if (triggered.includes('btn-supply')) {
+                key = 'supply';
+            } else if (triggered.includes('btn-production')) {
+                key = 'production';
+            }
+
+            const mode = modes[key];
+            const frame = mode.years[year];
+            const trace = Object.assign({}, figure.data[0], {z: frame.z, hovertemplate: mode.hovertemplate});
+            const layout = Object.assign({}, figure.layout, {
+                coloraxis: Object.assign({}, mode.coloraxis, {cmax: frame.cmax}),
+                title: Object.assign({}, figure.layout.title, {text: frame.title})
+            });
+            return [Object.assign({}, figure, {data: [trace], layout: layout}), key];
+        }
+    }
+});
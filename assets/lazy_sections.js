@@ -0,0 +1,28 @@
+(function () {
+    /* Section figures already asked for */
+    const shown = new Set();
+
+    window.dash_clientside = Object.assign({}, window.dash_clientside, {
+        lazy: {
+            /* Flag the placeholder graphs near the viewport once, and stop polling when every figure is asked for */
+            reveal: function (n_intervals, config) {
+                const no_update = window.dash_clientside.no_update;
+
+                const visible = config.ids.map(function (id) {
+                    const element = document.getElementById(id);
+                    // Graphs on an unselected tab are not rendered
+                    if (shown.has(id) || !element || element.offsetParent === null) {
+                        return no_update;
+                    }
+                    const rect = element.getBoundingClientRect();
+                    if (rect.top > window.innerHeight + config.margin || rect.bottom < -config.margin) {
+                        return no_update;
+                    }
+                    shown.add(id);
+                    return true;
+                });
+                return visible.concat([shown.size === config.ids.length]);
+            }
+        }
+    });
+})();
@@ -0,0 +1,97 @@
+import argparse
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+root = Path(__file__).parent.parent
+
+# `import app` may take at most this long
+max_seconds = 1.5
+# Modules the app must not load at import, they are only used by the notebooks or when a figure is built.
+# plotly imports the PIL package itself, PIL.Image is the expensive part
+denied_modules = ['matplotlib', 'seaborn', 'sklearn', 'statsmodels', 'scipy', 'plotly.express', 'PIL.Image']
+
+code = '''
+import json, sys, time
+start = time.perf_counter()
+import app
+print(json.dumps({'seconds': time.perf_counter() - start, 'modules': sorted(sys.modules)}))
+'''
+
+
+def import_app(importtime=False):
+    command = [sys.executable] + (['-X', 'importtime'] if importtime else []) + ['-c', code]
+    result = subprocess.run(command, cwd=root, capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.splitlines()[-1]), result.stderr
+
+
+def parse_importtime(stderr):
+    """ (module, cumulative microseconds, nesting depth) for every line written by -X importtime """
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        entries.append((name.strip(), int(cumulative), (len(name) - len(name.lstrip())) // 2))
+    return entries
+
+
+def app_imports(entries):
+    """ The modules app imports directly. -X importtime lists a module after everything it imported. """
+    index = next(i for i, (name, _, level) in enumerate(entries) if name == 'app' and level == 0)
+    children = []
+    for name, cumulative, level in reversed(entries[:index]):
+        if level == 0:
+            break
+        if level == 1:
+            children.append((name, cumulative))
+    return children
+
+
+def import_chain(entries, module):
+    """ The module and the modules that imported it, up to app """
+    index = next((i for i, (name, _, _) in enumerate(entries) if name == module), None)
+    if index is None:
+        return module
+    chain, depth = [module], entries[index][2]
+    for name, _, level in entries[index + 1:]:
+        if level < depth:
+            chain.append(name)
+            depth = level
+        if level == 0:
+            break
+    return ' <- '.join(chain)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Fail when `import app` is slow or loads denied modules')
+    parser.add_argument('--max-seconds', type=float, default=max_seconds)
+    parser.add_argument('--deny', nargs='*', default=denied_modules, help='packages app must not import')
+    parser.add_argument('--repeat', type=int, default=3, help='imports timed, the fastest is checked')
+    parser.add_argument('--top', type=int, default=10, help='slowest imports to list')
+    args = parser.parse_args()
+
+    seconds = min(import_app()[0]['seconds'] for _ in range(args.repeat))
+    result, stderr = import_app(importtime=True)
+    entries = parse_importtime(stderr)
+
+    print(f'import app: {seconds:.3f}s (budget {args.max_seconds:.3f}s)')
+    print('slowest imports below app:')
+    for name, cumulative in sorted(app_imports(entries), key=lambda e: -e[1])[:args.top]:
+        print(f'  {name:<40} {cumulative / 1e6:.3f}s')
+
+    failures = []
+    if seconds > args.max_seconds:
+        failures.append(f'import app took {seconds:.3f}s, over the budget of {args.max_seconds:.3f}s')
+    for module in args.deny:
+        if module in result['modules']:
+            failures.append(f'denied module loaded: {import_chain(entries, module)}')
+
+    if failures:
+        print('\n'.join(failures))
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
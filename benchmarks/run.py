@@ -0,0 +1,243 @@
+import argparse
+import importlib
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+root = Path(__file__).parent.parent
+results_path = Path(__file__).parent / 'results.json'
+baseline_path = Path(__file__).parent / 'baseline.json'
+
+# Run as `python benchmarks/run.py` only benchmarks/ is on the path
+if str(root) not in sys.path:
+    sys.path.insert(0, str(root))
+
+# Packages the timings depend on, a baseline recorded with other versions is not compared against
+environment_packages = ['numpy', 'pandas', 'pyarrow', 'plotly', 'dash']
+# Timings that grew by less than this many seconds are noise, whatever their relative growth
+min_regression_seconds = 0.025
+
+
+def measure(func, repeat):
+    """ Best wall time over repeat runs, then the peak traced memory of one more run """
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        times.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return result, {'seconds': min(times), 'peak_mb': peak / 1e6}
+
+
+def bench_loaders(repeat):
+    import plots.data  # noqa: F401 - registers the loaders
+    from plots.store import loaders, is_fresh, read_artifact
+
+    results = {}
+    for name, loader in loaders.items():
+        df, results[f'loader.{name}.csv'] = measure(loader['loader'], repeat)
+        results[f'loader.{name}.csv']['rows'] = len(df)
+        if is_fresh(name):
+            _, results[f'loader.{name}.artifact'] = measure(lambda: read_artifact(name), repeat)
+    return results
+
+
+def figure_specs():
+    """ Every figure builder with the arguments the app uses """
+    from plots import bar_plots, choropleth_maps, line_plots
+    from plots.data import datasets, industry_elements
+    from utils.config import story_countries
+
+    consumption_by_year = datasets['consumption_by_year']
+    return {
+        'plot_consumption_map': (choropleth_maps.plot_consumption_map, datasets['consumption']),
+        'plot_consumption_year': (choropleth_maps.plot_consumption_year, consumption_by_year,
+                                  consumption_by_year.columns.min()),
+        'plot_industry_map': (choropleth_maps.plot_industry_map,
+                              datasets['industry_cube'].slice(industry_elements['production'], 2017).reset_index(),
+                              'Production for year 2017'),
+        'plot_avg_global_consumption': (line_plots.plot_avg_global_consumption, datasets['consumption']),
+        'plot_sustainability': (line_plots.plot_sustainability, datasets['sustainability']),
+        **{f'plot_fishing_type.{country}': (line_plots.plot_fishing_type,
+                                            datasets['fishing_type_entities'].select(country), country)
+           for country in story_countries},
+        'plot_gdp_cons': (line_plots.plot_gdp_cons, datasets['gdp_entities'].select(*story_countries),
+                          datasets['consumption'], datasets['gdp_consumption_trends']),
+        'plot_aquaculture_production': (line_plots.plot_aquaculture_production,
+                                        datasets['aquaculture_entities'].select(*story_countries)),
+        'plot_protein': (bar_plots.plot_protein, datasets['protein_entities'].select(*story_countries)),
+        'plot_protein_ghg': (bar_plots.plot_protein_ghg, datasets['protein_ghg']),
+        'plot_aquaculture_emissions': (bar_plots.plot_aquaculture_emissions, datasets['aquaculture_emissions']),
+    }
+
+
+def bench_figures(repeat):
+    results = {}
+    for name, (plot, *args) in figure_specs().items():
+        build = plot.uncached
+        fig, results[f'figure.{name}'] = measure(lambda: build(*args), repeat)
+        results[f'figure.{name}']['bytes'] = len(json.dumps(fig, separators=(',', ':')))
+    return results
+
+
+def bench_datasets(repeat):
+    """ Every registered dataset, derived ones included, built by its loader from the datasets it requires """
+    from plots.data import datasets
+
+    results = {}
+    for name in datasets.with_requirements(list(datasets.loaders)):
+        for required in datasets.requires[name]:
+            datasets[required]
+        result, results[f'dataset.{name}'] = measure(datasets.loaders[name], repeat)
+        if hasattr(result, '__len__'):
+            results[f'dataset.{name}']['rows'] = len(result)
+    return results
+
+
+def bench_industry(repeat):
+    from plots.data import datasets, industry_elements, group_by_elements, get_industry_cube
+
+    results = {}
+    for key, elements in industry_elements.items():
+        _, results[f'industry.group_by_elements.{key}'] = measure(
+            lambda: group_by_elements(datasets['industry'], datasets['population'], elements, '2017'), repeat)
+    _, results['industry.cube.build'] = measure(get_industry_cube, repeat)
+    cube = datasets['industry_cube']
+    for key, elements in industry_elements.items():
+        _, results[f'industry.cube.slice.{key}'] = measure(lambda: cube.slice(elements, 2017), repeat)
+    return results
+
+
+def bench_entities(repeat):
+    """ Selecting the story countries from the entity stores against the boolean masks they replace """
+    from plots.data import datasets
+    from utils.config import story_countries
+
+    results = {}
+    for name, column in [('gdp', 'Country Name'), ('aquaculture', 'Country')]:
+        df, store = datasets[name], datasets[f'{name}_entities']
+        _, results[f'entities.{name}.mask'] = measure(lambda: df[df[column].isin(story_countries)], repeat)
+        _, results[f'entities.{name}.select'] = measure(lambda: store.select(*story_countries), repeat)
+    return results
+
+
+def bench_import_app(repeat):
+    code = 'import time; start = time.perf_counter(); import app; print(time.perf_counter() - start)'
+    times = [
+        float(subprocess.run([sys.executable, '-c', code], cwd=root, capture_output=True, text=True,
+                             check=True).stdout.split()[-1])
+        for _ in range(repeat)
+    ]
+    return {'app.import': {'seconds': min(times)}}
+
+
+def bench_layout():
+    """ Build the whole layout in a fresh process with an empty figure cache and measure the response """
+    code = '\n'.join([
+        'import time',
+        'from unittest import mock',
+        'import app',
+        'from plots import figure_cache',
+        'with mock.patch.object(figure_cache, "cache_dir", figure_cache.cache_dir.with_name("figures-benchmark")):',
+        '    figure_cache.purge()',
+        '    start = time.perf_counter()',
+        '    size = len(app.server.test_client().get("/_dash-layout").data)',
+        '    print(time.perf_counter() - start, size)',
+        '    figure_cache.purge()',
+    ])
+    seconds, size = subprocess.run([sys.executable, '-c', code], cwd=root, capture_output=True, text=True,
+                                   check=True).stdout.split()[-2:]
+    return {'app.layout': {'seconds': float(seconds), 'bytes': int(size)}}
+
+
+def environment():
+    """ Python and package versions and the cores of this machine """
+    env = {'python': platform.python_version(), 'cpus': os.cpu_count()}
+    for package in environment_packages:
+        try:
+            env[package] = importlib.import_module(package).__version__
+        except ImportError:
+            env[package] = None
+    return env
+
+
+def compare(results, baseline, max_regression):
+    """ Metrics that grew more than max_regression relative to the baseline """
+    regressions = []
+    for name, metrics in results.items():
+        for metric, value in metrics.items():
+            if metric == 'rows' or metric not in baseline.get(name, {}):
+                continue
+            base = baseline[name][metric]
+            if metric == 'seconds' and value - base < min_regression_seconds:
+                continue
+            if base > 0 and (value - base) / base > max_regression:
+                regressions.append(f'{name} {metric}: {base:.4g} -> {value:.4g} (+{(value - base) / base:.0%})')
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark loaders, figure builders, payload sizes and app import')
+    parser.add_argument('--repeat', type=int, default=3, help='runs per benchmark, the fastest is reported')
+    parser.add_argument('--max-regression', type=float, default=0.5,
+                        help='allowed relative growth of any metric over the baseline')
+    parser.add_argument('--baseline', type=Path, default=baseline_path)
+    parser.add_argument('--output', type=Path, default=results_path)
+    parser.add_argument('--save-baseline', action='store_true', help='store these results as the new baseline')
+    parser.add_argument('--only', nargs='*',
+                        default=['loaders', 'datasets', 'industry', 'entities', 'figures', 'import', 'layout'],
+                        choices=['loaders', 'datasets', 'industry', 'entities', 'figures', 'import', 'layout'])
+    args = parser.parse_args()
+
+    suites = {
+        'loaders': lambda: bench_loaders(args.repeat),
+        'datasets': lambda: bench_datasets(args.repeat),
+        'industry': lambda: bench_industry(args.repeat),
+        'entities': lambda: bench_entities(args.repeat),
+        'figures': lambda: bench_figures(args.repeat),
+        'import': lambda: bench_import_app(args.repeat),
+        'layout': bench_layout,
+    }
+
+    results = {}
+    for suite in args.only:
+        results.update(suites[suite]())
+
+    for name, metrics in results.items():
+        print(f'{name:<45} ' + '  '.join(f'{metric}={value:.4g}' for metric, value in metrics.items()))
+
+    run = {'environment': environment(), 'results': results}
+    args.output.write_text(json.dumps(run, indent=2))
+    if args.save_baseline:
+        args.baseline.write_text(json.dumps(run, indent=2))
+        return
+
+    if args.baseline.exists():
+        baseline = json.loads(args.baseline.read_text())
+        recorded = baseline.get('environment', {})
+        differences = [f'{key} {recorded.get(key)} -> {value}'
+                       for key, value in run['environment'].items() if recorded.get(key) != value]
+        if differences:
+            print(f'\nThe baseline was recorded in another environment ({", ".join(differences)}), not comparing. '
+                  'Record one here with --save-baseline.')
+            return
+
+        regressions = compare(results, baseline['results'], args.max_regression)
+        if regressions:
+            print('\nRegressions against the baseline:')
+            print('\n'.join(regressions))
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
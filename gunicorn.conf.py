@@ -0,0 +1,30 @@
+""" gunicorn settings, read from the working directory by `gunicorn app:server` """
+
+# Import the app in the master so the workers fork from a single loaded copy
+preload_app = True
+
+
+def on_starting(server):
+    """ Load the data before the port is bound, so no traffic reaches the workers until preload has finished """
+    import gc
+    import app
+    from plots.registry import startup_report
+
+    seconds = app.preload()
+    for line in startup_report(app.datasets, app.startup_timings):
+        server.log.info(line)
+    server.log.info('Preloaded datasets and layout in %.2fs, %d objects frozen', seconds, gc.get_freeze_count())
+
+
+def post_fork(server, worker):
+    """ Workers inherit the metrics the master recorded while preloading, each reports only its own """
+    from utils.metrics import reset
+
+    reset()
+
+
+def post_worker_init(worker):
+    """ Without preload_app each worker imports the app itself and preloads here before accepting requests """
+    from app import preload
+
+    preload()
@@ -1,11 +1,19 @@
 import pandas as pd
 
+from plots.figure_cache import cache_figure
 from utils.decorator import style_plot
-import plotly.express as px
+from utils.encoding import compact_figure
+from utils.metrics import timed
 
 
+@timed('figure')
+@cache_figure
+@compact_figure
 @style_plot
 def plot_protein(protein):
+    import plotly.express as px
+
+    protein = protein.set_index('Entity')
     protein_sum = protein.sum(axis=1)
 
     protein_cds = {'countries': list(protein.index.values)}
@@ -25,7 +33,7 @@ def plot_protein(protein):
                  orientation='h')
 
     fig.update_layout(
-        title='Distribution of protein sources<br><sup>China vs Norway</sup>',
+        title=f'Distribution of protein sources<br><sup>{" vs ".join(protein.index)}</sup>',
         xaxis=dict(
             title='Protein distribution (%)',
             showgrid=True
@@ -39,8 +47,13 @@ def plot_protein(protein):
     return fig
 
 
+@timed('figure')
+@cache_figure
+@compact_figure
 @style_plot
 def plot_protein_ghg(df):
+    import plotly.express as px
+
     df = df.sort_values('Protein source', ascending=False)
 
     fig = px.bar(df,
@@ -63,8 +76,13 @@ def plot_protein_ghg(df):
     return fig
 
 
+@timed('figure')
+@cache_figure
+@compact_figure
 @style_plot
 def plot_aquaculture_emissions(df):
+    import plotly.express as px
+
     fig = px.bar(df,
                  x='Amount',
                  y='Entity',
@@ -0,0 +1,192 @@
+import argparse
+import hashlib
+import inspect
+import json
+import os
+import time
+from functools import partial
+from pathlib import Path
+
+from plots import figure_cache, store
+from plots.registry import datasets
+
+root = Path(__file__).parent.parent
+manifest_path = root / 'build' / 'dag.json'
+
+
+def load_manifest():
+    """ Digests of the files, datasets and figures as of the last build, and what every figure read """
+    if not manifest_path.exists():
+        return {'files': {}, 'datasets': {}, 'figures': {}}
+    return json.loads(manifest_path.read_text())
+
+
+def save_manifest(manifest):
+    manifest_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = manifest_path.with_suffix(f'.{os.getpid()}.tmp')
+    tmp_path.write_text(json.dumps(manifest, indent=2, sort_keys=True))
+    os.replace(tmp_path, manifest_path)
+
+
+def combine(*parts):
+    return hashlib.sha1('\n'.join(parts).encode()).hexdigest()
+
+
+def relative(path):
+    return Path(path).relative_to(root).as_posix()
+
+
+def file_digest(path):
+    return store.file_digest(path) if path.exists() else 'missing'
+
+
+def dataset_files(name):
+    """ The source files of a dataset's artifact, or the module of its loader, and the files it was registered with """
+    if name in store.loaders:
+        files = list(store.loaders[name]['sources'])
+    else:
+        files = [Path(inspect.getsourcefile(inspect.unwrap(datasets.loaders[name])))]
+    return files + [root / source for source in datasets.sources[name]]
+
+
+def dataset_digests():
+    """
+    Digest of every registered dataset from the content of its files and the digests of the datasets it requires,
+    so a changed file changes the digest of every dataset downstream of it
+
+    """
+    digests = {}
+    for name in datasets.with_requirements(list(datasets.loaders)):
+        digests[name] = combine(name,
+                                *[f'{relative(path)}:{file_digest(path)}' for path in dataset_files(name)],
+                                *[digests[required] for required in datasets.requires[name]])
+    return digests
+
+
+def builder_source(builder):
+    """ Source of a layout figure builder, a function, a lambda or a partial of a plot function """
+    if isinstance(builder, partial):
+        return inspect.getsource(builder.func) + repr(builder.args) + repr(builder.keywords)
+    return inspect.getsource(builder)
+
+
+def figure_digest(builder, entry, digests):
+    """ Digest of a figure from its builder, the datasets it read and the versions of the plot functions it called """
+    return combine(builder_source(builder),
+                   *[f'{name}:{digests.get(name)}' for name in sorted(entry['datasets'])],
+                   *[f'{name}:{figure_cache.versions.get(name)}' for name in sorted(entry['functions'])])
+
+
+def plan(manifest, builders, force=False):
+    """ The stale datasets and figures, each with the inputs that changed since the last build """
+    digests = dataset_digests()
+
+    stale_datasets = {}
+    for name, digest in digests.items():
+        if force:
+            stale_datasets[name] = ['forced']
+        elif name not in manifest['datasets']:
+            stale_datasets[name] = ['new']
+        elif manifest['datasets'][name] != digest:
+            stale_datasets[name] = [relative(path) for path in dataset_files(name)
+                                    if manifest['files'].get(relative(path)) != file_digest(path)]
+            stale_datasets[name] += [required for required in datasets.requires[name] if required in stale_datasets]
+        elif name in store.loaders and not store.is_fresh(name):
+            stale_datasets[name] = ['artifact']
+
+    stale_figures = {}
+    for name, builder in builders.items():
+        entry = manifest['figures'].get(name)
+        if force:
+            stale_figures[name] = ['forced']
+        elif entry is None:
+            stale_figures[name] = ['new']
+        elif figure_digest(builder, entry, digests) != entry['digest']:
+            stale_figures[name] = [dataset for dataset in sorted(entry['datasets']) if dataset in stale_datasets]
+            if not stale_figures[name]:
+                stale_figures[name] = ['code']
+        elif not all((figure_cache.cache_dir / path).exists() for path in entry['cache']):
+            stale_figures[name] = ['cache']
+    return digests, stale_datasets, stale_figures
+
+
+def build(force=False, dry_run=False):
+    """
+    Compile the stale artifacts, then rebuild the stale figures into the figure cache, recording the datasets and
+    plot functions each one reads. Returns the stale datasets and figures with their changed inputs, and the
+    seconds spent on every node rebuilt.
+
+    """
+    import app
+
+    manifest = load_manifest()
+    builders = app.layout_figures()
+    digests, stale_datasets, stale_figures = plan(manifest, builders, force)
+    timings = {}
+    if dry_run:
+        return stale_datasets, stale_figures, timings
+
+    for name in stale_datasets:
+        if name in store.loaders and (force or not store.is_fresh(name)):
+            start = time.perf_counter()
+            store.compile_artifact(name)
+            timings[name] = time.perf_counter() - start
+
+    for name in stale_figures:
+        with datasets.recording() as names, figure_cache.recording() as calls:
+            start = time.perf_counter()
+            builders[name]()
+            timings[name] = time.perf_counter() - start
+        entry = {
+            'datasets': sorted(names),
+            'functions': {function: version for function, version, _ in calls},
+            'cache': sorted({path for _, _, path in calls}),
+        }
+        entry['digest'] = figure_digest(builders[name], entry, digests)
+        manifest['figures'][name] = entry
+
+    # Tables derived in memory are rebuilt by loading them, which the figures above mostly did already
+    for name in stale_datasets:
+        if name not in store.loaders:
+            datasets[name]
+            timings[name] = datasets.load_times[name]
+
+    paths = {path for name in digests for path in dataset_files(name)}
+    manifest['files'] = {relative(path): file_digest(path) for path in paths}
+    manifest['datasets'] = digests
+    save_manifest(manifest)
+    return stale_datasets, stale_figures, timings
+
+
+def report(stale_datasets, stale_figures, timings):
+    import app
+
+    nodes = [('dataset', name, stale_datasets.get(name)) for name in datasets.with_requirements(list(datasets.loaders))]
+    nodes += [('figure', name, stale_figures.get(name)) for name in app.layout_figures()]
+
+    lines = [f'{"node":<8} {"name":<38} {"status":<6} {"seconds":>8}  changed']
+    for kind, name, changed in nodes:
+        status = 'fresh' if changed is None else 'stale'
+        seconds = f'{timings[name]:8.3f}' if name in timings else f'{"":8}'
+        lines.append(f'{kind:<8} {name:<38} {status:<6} {seconds}  {", ".join(changed or [])}')
+
+    stale = len(stale_datasets) + len(stale_figures)
+    lines.append(f'{stale} of {len(nodes)} stale, rebuilt in {sum(timings.values()):.2f}s' if timings else
+                 f'{stale} of {len(nodes)} stale')
+    return lines
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Rebuild the artifacts and figures downstream of changed inputs')
+    parser.add_argument('--dry-run', action='store_true', help='only report what is stale')
+    parser.add_argument('--force', action='store_true', help='rebuild every artifact and figure')
+    args = parser.parse_args()
+
+    print('\n'.join(report(*build(force=args.force, dry_run=args.dry_run))))
+
+
+if __name__ == '__main__':
+    # Run the imported module, whose registries are the ones the other modules fill
+    import plots.build
+
+    plots.build.main()
@@ -1,14 +1,20 @@
-import json
-import plotly.express as px
 from utils.config import colors, font
 
+from plots.figure_cache import cache_figure
+from plots.geometry import countries_geojson
 from utils.decorator import style_plot
+from utils.encoding import compact_figure, encode_array
+from utils.metrics import timed
 
 
+@timed('figure')
+@cache_figure
+@compact_figure
 @style_plot
 def plot_consumption_map(df):
-    with open('data/countries-simplified.json') as response:
-        countries = json.load(response)
+    import plotly.express as px
+
+    countries = countries_geojson(df['Code'])
 
     range_color = (0, df.consumption.quantile(0.99))
 
@@ -110,14 +116,67 @@ def plot_consumption_map(df):
     return fig
 
 
+@timed('figure')
+@cache_figure
+@compact_figure
+@style_plot
+def plot_consumption_year(df, year):
+    """ Consumption map of a single year, df has a row per country and a column per year """
+    import plotly.express as px
+
+    countries = countries_geojson(df.index.get_level_values('Code'))
+
+    range_color = (0, df.stack().quantile(0.99))
+
+    df_year = df[year].rename('consumption').reset_index()
+
+    fig = px.choropleth_mapbox(df_year,
+                               zoom=0.5,
+                               geojson=countries,
+                               featureidkey='properties.ISO_A3',
+                               locations='Code',
+                               color='consumption',
+                               hover_name='country',
+                               mapbox_style="carto-positron",
+                               color_continuous_scale='YlOrRd',
+                               range_color=range_color,
+                               title='Fish consumption (kg / capita) from 1961 to 2017',
+                               center={'lat': 12, 'lon': 5})
+    fig.update_layout(width=800,
+                      height=600,
+                      margin=dict(
+                          l=60,
+                          r=0,
+                          b=60,
+                          t=100,
+                          pad=4,
+                          autoexpand=True
+                      ),
+                      coloraxis=dict(
+                          colorbar=dict(
+                              title=dict(
+                                  text='Consumption<br>(kg/capita)',
+                                  font=dict(
+                                      size=17
+                                  )
+                              )
+                          )
+                      ))
+    return fig
+
+
+@timed('figure')
+@cache_figure
+@compact_figure
 @style_plot
 def plot_industry_map(df, title, quantile=0.975, **kwargs):
     """ Plot Import Export Supply Production """
-    with open('data/countries-simplified.json') as response:
-        countries = json.load(response)
+    import plotly.express as px
+
+    countries = countries_geojson(df['Country Code'])
 
     type = title.split(' ')[0]
-    df = df.rename({'value_pr_capita_2017': type}, axis=1)
+    df = df.rename(columns=lambda col: type if col.startswith('value_pr_capita') else col)
     range_color = (0, df[type].quantile(quantile))
 
     map_args = dict(
@@ -146,3 +205,39 @@ def plot_industry_map(df, title, quantile=0.975, **kwargs):
                           }
                       })
     return fig
+
+
+def industry_mode_map(cube, key, element_names, year, quantile=0.975):
+    """ The full industry map of one element over every country of the cube, as industry_map_modes builds it """
+    return plot_industry_map(cube.slice(element_names, year, dropna=False).reset_index(),
+                             title=f"{key.capitalize()} for year {year}",
+                             quantile=quantile)
+
+
+def industry_map_modes(cube, elements, year, quantile=0.975):
+    """
+    Industry maps for every element and year over the countries of the cube. Returns the full figure of the
+    first element in the given year and, per element, only the parts that differ between the maps so the
+    browser can swap them.
+
+    """
+    modes = {}
+    figures = {}
+    for key, element_names in elements.items():
+        figures[key] = industry_mode_map(cube, key, element_names, year, quantile)
+
+        years = {}
+        for map_year in cube.years:
+            values = cube.slice(element_names, map_year, dropna=False)[f'value_pr_capita_{map_year}']
+            years[int(map_year)] = {
+                'z': encode_array(values.to_numpy(), display=True),
+                'cmax': float(values.quantile(quantile)),
+                'title': f"{key.capitalize()} for year {map_year}"
+            }
+
+        modes[key] = {
+            'hovertemplate': figures[key]['data'][0]['hovertemplate'],
+            'coloraxis': figures[key]['layout']['coloraxis'],
+            'years': years
+        }
+    return figures[next(iter(elements))], modes
@@ -0,0 +1,61 @@
+from functools import lru_cache
+
+import pandas as pd
+
+from plots.schema import read_csv
+
+# Names used by the data sources mapped to the canonical names in country_code_map.csv
+aliases = {
+    'China, mainland': 'China',
+    'China, Hong Kong SAR': 'China',
+    'China, Macao SAR': 'China',
+    'China, Taiwan Province of': 'Taiwan',
+    "C?te d'Ivoire": "Côte d'Ivoire",
+    'Netherlands Antilles (former)': 'Netherlands',
+    'Bolivia (Plurinational State of)': 'Bolivia',
+    'Cabo Verde': 'Cape Verde',
+    'Czechia': 'Czech Republic',
+    "Democratic People's Republic of Korea": 'South Korea',
+    'Democratic Republic of the Congo': 'Congo',
+    'Eswatini': 'Swaziland',
+    'Iran (Islamic Republic of)': 'Iran, Islamic Republic of',
+    'North Macedonia': 'Macedonia, the former Yugoslav Republic of',
+    'Republic of Korea': 'Korea, Republic of',
+    'United Kingdom of Great Britain and Northern Ireland': 'United Kingdom',
+    'Republic of Moldova': 'Moldova, Republic of',
+    'United Republic of Tanzania': 'Tanzania, United Republic of',
+    'United States of America': 'United States',
+    'Venezuela (Bolivarian Republic of)': 'Venezuela, Bolivarian Republic of',
+}
+
+
+class CountryIndex:
+    """
+    Canonical country names and ISO 3166 alpha-3 codes. Every lookup maps a whole column at once.
+
+    """
+
+    def __init__(self, path):
+        df = read_csv(path)
+        codes = df['Alpha-3 code'].str.split('"').str[1]
+
+        self.name_to_code = pd.Series(codes.values, index=df['Country'].values)
+        # Countries listed under several names keep the last one, as get_country_code_map always did
+        self.code_to_name = pd.Series(df['Country'].values, index=codes.values).groupby(level=0).last()
+        self.aliases = pd.Series(aliases)
+
+    def normalize(self, names):
+        """ Replace source specific spellings with the canonical names """
+        return names.map(self.aliases).fillna(names)
+
+    def to_code(self, names):
+        """ Alpha-3 codes of canonical names, NaN for unknown names """
+        return names.map(self.name_to_code)
+
+    def to_name(self, codes):
+        return codes.map(self.code_to_name)
+
+
+@lru_cache(maxsize=None)
+def get_country_index():
+    return CountryIndex('data/country_code_map.csv')
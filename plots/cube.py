@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+
+from plots.countries import get_country_index
+
+
+class IndustryCube:
+    """
+    FAOSTAT industry values aggregated once into country x element x year arrays, absolute and per capita.
+    Selecting an element and year is an index into the arrays instead of a groupby.
+
+    """
+
+    def __init__(self, df, population):
+        self.codes = pd.Index(np.sort(df['Country Code'].unique()), name='Country Code')
+        self.elements = pd.Index(np.sort(df['Element'].unique()), name='Element')
+        self.years = pd.Index(np.sort(df['Year'].unique()), name='Year')
+        self.names = pd.Index(get_country_index().to_name(self.codes.to_series()).values, name='Country')
+
+        shape = (len(self.codes), len(self.elements), len(self.years))
+        index = pd.MultiIndex.from_product([self.codes, self.elements, self.years])
+        grouped = df.groupby(['Country Code', 'Element', 'Year'])['Value']
+
+        self.present = np.ascontiguousarray(grouped.size().reindex(index, fill_value=0).to_numpy().reshape(shape) > 0)
+        self.values = np.ascontiguousarray(grouped.sum().reindex(index, fill_value=0).to_numpy().reshape(shape))
+
+        self.population = population['population'].reindex(
+            pd.MultiIndex.from_product([self.codes, self.years])
+        ).to_numpy().reshape(len(self.codes), len(self.years))
+        self.per_capita = self.values / self.population[:, np.newaxis, :] * 1000
+
+    def slice(self, elements, year, dropna=True):
+        """
+        Values and values per capita of the summed elements for one year, in the shape returned by
+        group_by_elements. With dropna=False every country of the cube is kept, in the same order for every slice.
+
+        """
+        element_idx = self.elements.get_indexer(elements)
+        if (element_idx < 0).any():
+            raise KeyError(f'Unknown elements in {elements}')
+        year_idx = self.years.get_loc(int(year))
+
+        df = pd.DataFrame({
+            'Country Code': self.codes,
+            'Value': self.values[:, element_idx, year_idx].sum(axis=1),
+            f'value_pr_capita_{year}': self.per_capita[:, element_idx, year_idx].sum(axis=1)
+        }, index=self.names)
+
+        present = self.present[:, element_idx, year_idx].any(axis=1)
+        if dropna:
+            return df[present]
+        df.loc[~present, ['Value', f'value_pr_capita_{year}']] = np.nan
+        return df
@@ -1,19 +1,25 @@
 import pandas as pd
-from pathlib import Path
 
-root = Path(__file__).parent.parent
+from plots.countries import get_country_index
+from plots.cube import IndustryCube
+from plots.entities import EntityStore
+from plots.registry import datasets
+from plots.schema import read_csv
+from plots.store import stored
+from plots.trend import gdp_consumption_trends
+from utils.config import story_countries
+from utils.encoding import encode_array
+from utils.metrics import timed
 
 
 def group_by_elements(df, df_population, elements, year):
-    country_code_map, country_code_to_country = get_country_code_map()
-
-    df_production = df.query(f'Year == {year}').groupby(['Country Code', 'Element']).sum()['Value']
+    df_production = df.query(f'Year == {year}').groupby(['Country Code', 'Element'], observed=True).sum()['Value']
     df_production = df_production.reset_index().query(f'Element in {elements}').groupby(
-        'Country Code').sum().reset_index()
+        'Country Code', observed=True).sum().reset_index()
     df_production = pd.merge(df_population[['Country Code', f'{year}']], df_production, on='Country Code').rename(
         {f'{year}': 'Population'}, axis=1)
     df_production[f'value_pr_capita_{year}'] = df_production.Value / df_production.Population * 1000
-    df_production['Country'] = df_production.apply(lambda x: country_code_to_country[x['Country Code']], axis=1)
+    df_production['Country'] = get_country_index().to_name(df_production['Country Code'])
     df_production = df_production.set_index('Country')[['Country Code', 'Value', f'value_pr_capita_{year}']]
     return df_production
 
@@ -23,145 +29,141 @@ def get_country_code_map():
     Retrieve the mapping between country names to country codes and vice versa
 
     """
-    country_code_map = pd.read_csv(root / 'data/country_code_map.csv')[['Country', 'Alpha-3 code']]
-    country_code_map['Alpha-3 code'] = country_code_map['Alpha-3 code'].apply(lambda x: x.split('"')[1])
-    country_code_map = country_code_map.set_index('Country').to_dict(orient='index')
-    country_code_to_country = {value['Alpha-3 code']: key for key, value in country_code_map.items()}
+    index = get_country_index()
+    country_code_map = {country: {'Alpha-3 code': code} for country, code in index.name_to_code.items()}
+    country_code_to_country = index.code_to_name.to_dict()
     return country_code_map, country_code_to_country
 
 
 def add_population(df, country_col='Area'):
-    df_population = get_population()
-    country_code_map, country_code_to_country = get_country_code_map()
+    """
+    Attach the population of each row's country and year with a single indexed join.
+    Rows without a known population are dropped.
 
+    """
     if 'Country Code' not in df.columns:
-        df['Country Code'] = df.apply(lambda x: country_code_map[x[country_col]]['Alpha-3 code'], axis=1)
+        df = df.assign(**{'Country Code': get_country_index().to_code(df[country_col])})
 
-    melted = pd.melt(df_population, id_vars=['Country Name', 'Country Code'], value_vars=df_population.columns[2:],
-                     var_name='Year',
-                     value_name='population')
-    melted.Year = melted.Year.astype(int)
-    df = pd.merge(melted, df, on=['Country Code', 'Year'])
-    return df
+    population = datasets['population_long']
+    population = population[[col for col in population.columns if col not in df.columns]]
+    return df.join(population, on=['Country Code', 'Year'], how='inner')
 
 
+@timed('loader')
+@stored('population', 'data/population_total.csv', 'plots/schema.py')
 def get_population():
-    return pd.read_csv(root / 'data/population_total.csv')
+    return read_csv('data/population_total.csv')
+
+
+@timed('loader')
+def get_population_long():
+    """ Population with one row per country and year, indexed by (Country Code, Year) """
+    df = datasets['population']
+    df = pd.melt(df, id_vars=['Country Name', 'Country Code'], value_vars=df.columns[2:],
+                 var_name='Year',
+                 value_name='population')
+    df['Year'] = df.Year.astype(int)
+    return df.set_index(['Country Code', 'Year']).sort_index()
 
 
+@timed('loader')
+@stored('industry', 'data/FAOSTAT_country_supply_production_import_export.csv', 'data/population_total.csv',
+        'data/country_code_map.csv', 'plots/countries.py', 'plots/schema.py')
 def get_industry_data():
-    df = pd.read_csv(root / 'data/FAOSTAT_country_supply_production_import_export.csv')
-    df.loc[df['Area'] == "China, mainland", 'Area'] = 'China'
-    df.loc[df['Area'] == 'China, Hong Kong SAR', 'Area'] = 'China'
-    df.loc[df['Area'] == 'China, Macao SAR', 'Area'] = 'China'
-    df.loc[df['Area'] == "China, Taiwan Province of", 'Area'] = 'Taiwan'
-    df.loc[df['Area'] == "C?te d'Ivoire", 'Area'] = "Côte d'Ivoire"
-    df.loc[df['Area'] == "Netherlands Antilles (former)", 'Area'] = "Netherlands"
-    df.loc[df['Area'] == 'Bolivia (Plurinational State of)', 'Area'] = "Bolivia"
-    df.loc[df['Area'] == 'Cabo Verde', 'Area'] = "Cape Verde"
-    df.loc[df['Area'] == 'Czechia', 'Area'] = "Czech Republic"
-    df.loc[df['Area'] == "Democratic People's Republic of Korea", 'Area'] = "South Korea"
-    df.loc[df['Area'] == 'Democratic Republic of the Congo', 'Area'] = "Congo"
-    df.loc[df['Area'] == 'Eswatini', 'Area'] = "Swaziland"
-    df.loc[df['Area'] == 'Iran (Islamic Republic of)', 'Area'] = "Iran, Islamic Republic of"
-    df.loc[df['Area'] == 'North Macedonia', 'Area'] = "Macedonia, the former Yugoslav Republic of"
-    df.loc[df['Area'] == 'Republic of Korea', 'Area'] = "Korea, Republic of"
-    df.loc[df['Area'] == 'United Kingdom of Great Britain and Northern Ireland', 'Area'] = "United Kingdom"
-    df.loc[df['Area'] == 'Republic of Moldova', 'Area'] = "Moldova, Republic of"
-    df.loc[df['Area'] == 'United Republic of Tanzania', 'Area'] = "Tanzania, United Republic of"
-    df.loc[df['Area'] == 'United States of America', 'Area'] = 'United States'
-    df.loc[df['Area'] == 'Venezuela (Bolivarian Republic of)', 'Area'] = 'Venezuela, Bolivarian Republic of'
+    df = read_csv('data/FAOSTAT_country_supply_production_import_export.csv')
+    df['Area'] = get_country_index().normalize(df['Area'])
 
     df = add_population(df)
     return df
 
 
+@timed('loader')
+@stored('consumption', 'data/fish-and-seafood-consumption-per-capita.csv', 'plots/schema.py')
 def get_consumption():
-    df = pd.read_csv(root / "data/fish-and-seafood-consumption-per-capita.csv")
+    return read_csv('data/fish-and-seafood-consumption-per-capita.csv')
 
-    df = df.rename({'Fish, Seafood- Food supply quantity (kg/capita/yr) (FAO, 2020)': 'consumption',
-                    'Entity': 'country'}, axis=1)
 
-    return df
+@timed('loader')
+def get_consumption_by_year():
+    """
+    Consumption with one row per country and one column per year, the row order is shared by every year
 
+    """
+    df = datasets['consumption']
+    # observed=True keeps the pivot to the pairs in the data instead of every code and country combination
+    return df.pivot_table(index=['Code', 'country'], columns='Year', values='consumption', observed=True).sort_index()
 
+
+def consumption_frames(start, count):
+    """ Consumption values for count years from start, aligned to the rows of get_consumption_by_year """
+    df = datasets['consumption_by_year']
+    years = [year for year in df.columns if start <= year < start + count]
+    return {int(year): encode_array(df[year].to_numpy(), display=True) for year in years}
+
+
+@timed('loader')
+@stored('sustainability', 'data/fish-stocks-within-sustainable-levels.csv', 'plots/schema.py')
 def get_sustainability():
-    df = pd.read_csv(root / 'data/fish-stocks-within-sustainable-levels.csv')
-    df = df.rename({
-        'Share of fish stocks within biologically sustainable levels (FAO, 2020)': 'sustainable',
-        'Share of fish stocks that are overexploited': 'overexploited'
-    }, axis=1)
-    return df
+    return read_csv('data/fish-stocks-within-sustainable-levels.csv')
 
 
-def get_fishing_types():
-    fish_catch_methods = pd.read_csv(root / 'data/fish-catch-gear-type.csv')
-    fcm = fish_catch_methods[((fish_catch_methods["Entity"] == 'China') | (fish_catch_methods["Entity"] == 'Norway'))]
-    fcm = fcm.fillna(0)
+@timed('loader')
+@stored('fishing_types', 'data/fish-catch-gear-type.csv', 'plots/schema.py')
+def get_all_fishing_types():
+    """ Catches of every country by fishing method, indexed by year """
+    fcm = read_csv('data/fish-catch-gear-type.csv')
+    # Only the gear columns, pandas 1.2 refuses to fill the categorical Entity column with a new value
+    fcm = fcm.fillna({column: 0 for column in fcm.columns if column not in ['Entity', 'Year']})
     fcm['gear'] = fcm['other_gear'] + fcm['unknown_gear']
-    fcm = fcm.drop(columns=['Code', 'unknown_gear', 'other_gear'])
+    fcm = fcm.drop(columns=['unknown_gear', 'other_gear'])
     fcm = fcm.sort_values(by=['Year'])
     fcm = fcm.set_index('Year')
     return fcm
 
 
+@timed('loader')
+@stored('protein_ghg', 'data/ghg-per-protein-poore.csv', 'plots/schema.py')
 def get_protein_ghg():
     entities = ['Poultry', 'Pork', 'Beef', 'Lamb & goat', 'Eggs', 'Milk', 'Fish, Seafood']
 
-    gg = pd.read_csv(root / 'data/ghg-per-protein-poore.csv')
-    gg = gg.drop(columns=['Code', 'Year'])
-    gg = gg.query(f'Entity in {entities}')
-    gg = gg.rename({
-        'GHG emissions per 100g protein (Poore & Nemecek, 2018)': 'Emissions',
-        'Entity': 'Protein source'
-    }, axis=1)
-    return gg
+    gg = read_csv('data/ghg-per-protein-poore.csv')
+    return gg[gg['Protein source'].isin(entities)]
 
 
+@timed('loader')
+@stored('gdp', 'data/country_gdp.csv', 'data/population_total.csv', 'data/country_code_map.csv', 'plots/schema.py')
 def get_gdp():
-    df = pd.read_csv(root / 'data/country_gdp.csv')
-    df = pd.melt(df, ['Country Name', 'Country Code'], df.columns[4:(len(df.columns) - 1)],
+    df = read_csv('data/country_gdp.csv')
+    df = pd.melt(df, ['Country Name', 'Country Code'], df.columns[2:],
                  value_name='gdp', var_name='Year')
     df['Year'] = df.Year.astype(int)
     df = add_population(df)
-    df = df.drop('Country Name_x', axis=1)
-    df = df.rename({'Country Name_y': 'Country Name'}, axis=1)
     df['gdp_pr_capita'] = df.gdp / df.population
     return df
 
 
-def get_protein():
-    df = pd.read_csv('data/animal-protein-consumption.csv')
-    protein = df[((df["Entity"] == 'China') | (df["Entity"] == 'Norway'))]
-
+@timed('loader')
+@stored('protein', 'data/animal-protein-consumption.csv', 'plots/schema.py')
+def get_all_protein():
+    """ Protein supply of every country in 2017 by source """
+    protein = read_csv('data/animal-protein-consumption.csv')
     protein = protein[protein["Year"] == 2017]
-    protein = protein.drop(columns=['Code', 'Year', 'Other meat'])
-    protein = protein.set_index('Entity')
+    protein = protein.drop(columns=['Year'])
     return protein
 
 
+@timed('loader')
+@stored('aquaculture', 'data/capture-fisheries-vs-aquaculture.csv', 'data/population_total.csv',
+        'data/country_code_map.csv', 'plots/countries.py', 'plots/schema.py')
 def get_aquaculture():
-    capture_aqua = pd.read_csv('data/capture-fisheries-vs-aquaculture.csv')
-    capture_aqua_entity = capture_aqua[
-        ['Entity', 'Year', 'Aquaculture production (metric tons)', 'Capture fisheries production (metric tons)']]
-
-    capture_aqua_entity = capture_aqua_entity.sort_values(by=['Year'])
-
-    ca = capture_aqua_entity.query("['China', 'Norway'] in Entity")
+    ca = read_csv('data/capture-fisheries-vs-aquaculture.csv')
+    ca = ca.sort_values(by=['Year'])
 
-    ca = ca.rename({
-        'Aquaculture production (metric tons)': 'Aquaculture',
-        'Capture fisheries production (metric tons)': 'Capture fisheries'
-    }, axis=1)
-
-    df = pd.melt(ca, ['Entity', 'Year'],
+    df = pd.melt(ca, ['Country', 'Year'],
                  ['Aquaculture', 'Capture fisheries'],
                  var_name='Production Type',
                  value_name='Production')
-
-    df = df.rename({
-        'Entity': 'Country'
-    }, axis=1)
+    df['Production Type'] = df['Production Type'].astype('category')
 
     df = add_population(df, country_col='Country')
 
@@ -169,21 +171,97 @@ def get_aquaculture():
     return df
 
 
+@timed('loader')
+@stored('aquaculture_emissions', 'data/nitrogen-emissions-seafood.csv',
+        'data/phosphorous-emissions-seafood.csv', 'plots/schema.py')
 def get_aquaculture_emissions():
-    nitrogen_emissions_seafood = pd.read_csv('data/nitrogen-emissions-seafood.csv')
-    phosphorous_emissions_seafood = pd.read_csv('data/phosphorous-emissions-seafood.csv')
-
-    df = pd.merge(nitrogen_emissions_seafood, phosphorous_emissions_seafood)
-    df = df.drop(columns=['Code', 'Year'])
+    nitrogen_emissions_seafood = read_csv('data/nitrogen-emissions-seafood.csv')
+    phosphorous_emissions_seafood = read_csv('data/phosphorous-emissions-seafood.csv')
 
-    df = df.rename({
-        'Nitrogen (kgN / t edible weight)': 'Nitrogen',
-        'Phosphorous (kgP / t edible weight)': 'Phosphorous',
-    }, axis=1)
+    df = pd.merge(nitrogen_emissions_seafood, phosphorous_emissions_seafood, on='Entity')
 
     df = pd.melt(df, ['Entity'], ['Nitrogen', 'Phosphorous'],
                  var_name='Greenhouse Gas',
                  value_name='Amount')
 
     df['Entity'] = df['Entity'].apply(lambda x: x.replace(" (farmed)", ""))
-    return df
\ No newline at end of file
+    return df
+
+industry_elements = {
+    'production': ['Production'],
+    'import': ['Import Quantity'],
+    'supply': ['Domestic supply quantity'],
+    'export': ['Export Quantity']
+}
+
+
+@timed('loader')
+def get_gdp_consumption_trends():
+    return gdp_consumption_trends(datasets['gdp'], datasets['consumption'])
+
+
+@timed('loader')
+def get_industry_cube():
+    return IndustryCube(datasets['industry'], datasets['population_long'])
+
+
+def get_fishing_types():
+    """ Catches of the story countries by fishing method, indexed by year, as the explainer notebook reads them """
+    df = datasets['fishing_types']
+    return df[df['Entity'].isin(story_countries)]
+
+
+def get_protein():
+    """ Protein supply of the story countries in 2017 by source, indexed by country """
+    protein = datasets['protein_entities'].select(*story_countries).set_index('Entity')
+    protein.index = protein.index.astype(str)
+    return protein
+
+
+@timed('loader')
+def get_fishing_type_entities():
+    """ Tonnes caught by every fishing method, one row per country, year and method """
+    methods = ['longline', 'gillnet', 'small_scale', 'purse_seine', 'pelagic trawl', 'bottom_trawl', 'gear']
+    df = pd.melt(datasets['fishing_types'].reset_index(), ['Year', 'Entity'], methods,
+                 var_name='Fishing Type', value_name='Tonnes')
+    df['Fishing Type'] = pd.Categorical(df['Fishing Type'], categories=methods)
+    return EntityStore(df)
+
+
+@timed('loader')
+def get_protein_entities():
+    return EntityStore(datasets['protein'])
+
+
+@timed('loader')
+def get_gdp_entities():
+    return EntityStore(datasets['gdp'], 'Country Name')
+
+
+@timed('loader')
+def get_aquaculture_entities():
+    return EntityStore(datasets['aquaculture'], 'Country')
+
+
+datasets.register('consumption', get_consumption)
+datasets.register('consumption_by_year', get_consumption_by_year, requires=['consumption'])
+datasets.register('sustainability', get_sustainability)
+datasets.register('fishing_types', get_all_fishing_types)
+datasets.register('population', get_population)
+datasets.register('population_long', get_population_long, requires=['population'])
+datasets.register('industry', get_industry_data, requires=['population_long'])
+datasets.register('industry_cube', get_industry_cube, requires=['industry', 'population_long'],
+                  sources=['plots/cube.py', 'plots/countries.py'])
+datasets.register('gdp', get_gdp, requires=['population_long'])
+datasets.register('protein', get_all_protein)
+datasets.register('protein_ghg', get_protein_ghg)
+datasets.register('aquaculture', get_aquaculture, requires=['population_long'])
+datasets.register('aquaculture_emissions', get_aquaculture_emissions)
+datasets.register('gdp_consumption_trends', get_gdp_consumption_trends, requires=['gdp', 'consumption'],
+                  sources=['plots/trend.py'])
+datasets.register('fishing_type_entities', get_fishing_type_entities, requires=['fishing_types'],
+                  sources=['plots/entities.py'])
+datasets.register('protein_entities', get_protein_entities, requires=['protein'], sources=['plots/entities.py'])
+datasets.register('gdp_entities', get_gdp_entities, requires=['gdp'], sources=['plots/entities.py'])
+datasets.register('aquaculture_entities', get_aquaculture_entities, requires=['aquaculture'],
+                  sources=['plots/entities.py'])
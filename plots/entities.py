@@ -0,0 +1,43 @@
+import numpy as np
+import pandas as pd
+
+
+class EntityStore:
+    """
+    Rows of a dataset sorted once by entity, with the entity column holding categorical codes of the sorted names.
+    The rows of an entity are contiguous, so selecting any countries is a binary search per country instead of
+    a scan of the whole frame.
+
+    """
+
+    def __init__(self, df, entity='Entity'):
+        df = df.reset_index(drop=True)
+        df[entity] = df[entity].astype('category')
+        order = np.argsort(df[entity].cat.codes.to_numpy(), kind='stable')
+
+        self.entity = entity
+        self.frame = df.take(order).reset_index(drop=True)
+        self.codes = self.frame[entity].cat.codes.to_numpy()
+        self.entities = pd.Index(self.frame[entity].cat.categories, name=entity)
+
+    def __contains__(self, name):
+        return name in self.entities
+
+    def bounds(self, name):
+        """ First and past the last row of an entity """
+        code = self.entities.get_loc(name)
+        return np.searchsorted(self.codes, code, 'left'), np.searchsorted(self.codes, code, 'right')
+
+    def select(self, *names):
+        """
+        Rows of the given entities, each in the order of the source. The entity column of the result only has
+        the given names as categories, in the order given, so plots do not see the other countries.
+
+        """
+        bounds = [self.bounds(name) for name in names]
+        rows = np.concatenate([np.arange(start, end) for start, end in bounds] + [np.arange(0)])
+        codes = np.repeat(np.arange(len(names)), [end - start for start, end in bounds])
+
+        df = self.frame.take(rows)
+        df[self.entity] = pd.Categorical.from_codes(codes, categories=list(names))
+        return df
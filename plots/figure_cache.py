@@ -0,0 +1,192 @@
+import argparse
+import hashlib
+import inspect
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from functools import wraps
+from pathlib import Path
+
+import pandas as pd
+import plotly
+
+from utils import config, decorator, encoding
+from utils.config import figure_workers
+
+root = Path(__file__).parent.parent
+cache_dir = root / 'build' / 'figures'
+
+stats = Counter()
+# Version of every cached plot function by module and name, see function_version
+versions = {}
+# Lists collecting the plot functions called, their versions and cache files, see recording
+recorders = []
+
+
+def fingerprint(value):
+    """ Stable hash of a plot argument, DataFrames are hashed by content """
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        content = pd.util.hash_pandas_object(value, index=True).values.tobytes()
+        columns = repr(list(value.columns) if isinstance(value, pd.DataFrame) else value.name)
+        return hashlib.sha1(content + columns.encode()).hexdigest()
+    return hashlib.sha1(repr(value).encode()).hexdigest()
+
+
+def helper_modules(module, seen=None):
+    """ The plots modules a module imports, or imports names from, directly or through other plots modules """
+    seen = set() if seen is None else seen
+    for value in vars(module).values():
+        name = value.__name__ if inspect.ismodule(value) else getattr(value, '__module__', None)
+        if isinstance(name, str) and name.startswith('plots.') and name not in seen and name != __name__:
+            seen.add(name)
+            helper_modules(sys.modules[name], seen)
+    return seen
+
+
+def function_version(func):
+    """
+    Hash of the plot function source, the plots modules its module uses, the styling and encoding modules,
+    the plot configuration and plotly versions
+
+    """
+    func = inspect.unwrap(func)
+    helpers = sorted(helper_modules(sys.modules[func.__module__]) - {func.__module__})
+    source = ''.join([
+        inspect.getsource(func),
+        *[inspect.getsource(sys.modules[name]) for name in helpers],
+        inspect.getsource(decorator),
+        inspect.getsource(encoding),
+        inspect.getsource(config),
+        plotly.__version__,
+        encoding.plotlyjs_version()
+    ])
+    return hashlib.sha1(source.encode()).hexdigest()
+
+
+def cache_figure(func):
+    """
+    Store the serialized figure on disk keyed by the plot function version and its arguments.
+    The cached figure is returned as a plain dict, which dcc.Graph accepts as is.
+
+    """
+    version = function_version(func)
+    versions[f'{func.__module__}.{func.__name__}'] = version
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        key = hashlib.sha1(''.join(
+            [version] +
+            [fingerprint(arg) for arg in args] +
+            [name + fingerprint(value) for name, value in sorted(kwargs.items())]
+        ).encode()).hexdigest()
+        path = cache_dir / f'{func.__name__}-{key}.json'
+        for calls in recorders:
+            calls.append((f'{func.__module__}.{func.__name__}', version, path.name))
+
+        if path.exists():
+            stats[func.__name__, 'hit'] += 1
+            with open(path) as file:
+                return json.load(file)
+
+        stats[func.__name__, 'miss'] += 1
+        fig = func(*args, **kwargs)
+        fig_json = fig.to_json() if hasattr(fig, 'to_json') else json.dumps(fig, separators=(',', ':'))
+
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        # A file of its own per writer, threads of one process may build the same figure at once
+        with tempfile.NamedTemporaryFile('w', dir=cache_dir, prefix=path.stem, suffix='.tmp', delete=False) as file:
+            file.write(fig_json)
+        os.replace(file.name, path)
+
+        return json.loads(fig_json)
+
+    wrapper.uncached = func
+    return wrapper
+
+
+@contextmanager
+def recording():
+    """ Collect the cached plot functions called inside the block with their versions and cache files """
+    calls = []
+    recorders.append(calls)
+    try:
+        yield calls
+    finally:
+        recorders.remove(calls)
+
+
+def build_figure(name):
+    """ Build one of app.layout_figures in a pool process, the parent reads it back from the cache """
+    import app
+
+    stats.clear()
+    start = time.perf_counter()
+    app.layout_figures()[name]()
+    return time.perf_counter() - start, stats
+
+
+def prebuild(workers=figure_workers):
+    """
+    Build every layout figure and industry map variant concurrently in a process pool, writing them to the
+    cache. The datasets are loaded before the pool starts, so forked processes share them.
+    Returns the seconds spent on every figure.
+
+    """
+    import app
+
+    app.datasets.preload()
+    names = list(app.layout_figures())
+    timings = {}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for name, (seconds, counts) in zip(names, pool.map(build_figure, names)):
+            timings[name] = seconds
+            stats.update(counts)
+    return timings
+
+
+def warm(workers=figure_workers):
+    """ Build every layout figure and industry map so the cache holds all of them """
+    import app
+
+    timings = prebuild(workers)
+    app.serve_layout()
+    return timings
+
+
+def purge():
+    shutil.rmtree(cache_dir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Manage the on-disk figure cache')
+    parser.add_argument('command', choices=['warm', 'purge', 'stats'])
+    parser.add_argument('--workers', type=int, default=figure_workers, help='processes building figures for warm')
+    args = parser.parse_args()
+
+    if args.command == 'warm':
+        start = time.perf_counter()
+        timings = warm(args.workers)
+        for name, seconds in sorted(timings.items(), key=lambda item: -item[1]):
+            print(f'{name:<40} {seconds:6.2f}s')
+        for (name, outcome), count in sorted(stats.items()):
+            print(f'{name:<35} {outcome:<5} {count}')
+        print(f'{sum(timings.values()):.2f}s of figures built in {time.perf_counter() - start:.2f}s')
+    elif args.command == 'purge':
+        purge()
+    else:
+        files = list(cache_dir.glob('*.json'))
+        size = sum(file.stat().st_size for file in files)
+        print(f'{len(files)} cached figures, {size / 1e6:.1f} MB in {cache_dir}')
+
+
+if __name__ == '__main__':
+    # Run the imported module, whose registries are the ones the other modules fill
+    import plots.figure_cache
+
+    plots.figure_cache.main()
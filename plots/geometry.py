@@ -0,0 +1,66 @@
+import json
+from functools import lru_cache
+from pathlib import Path
+
+from utils.config import geometry_precision, geometry_resolution
+
+root = Path(__file__).parent.parent
+
+# Keep every n-th vertex of each ring
+resolutions = {
+    'full': 1,
+    'medium': 2,
+    'low': 4
+}
+
+
+@lru_cache(maxsize=None)
+def load_countries():
+    """ Parse the country outlines once per process """
+    with open(root / 'data/countries-simplified.json') as file:
+        return json.load(file)
+
+
+def simplify_ring(ring, step, precision):
+    points = ring[:-1][::step] + [ring[-1]]
+    points = [[round(lon, precision), round(lat, precision)] for lon, lat in points]
+    points = [point for i, point in enumerate(points) if i == 0 or point != points[i - 1]]
+
+    # A closed ring needs at least four positions, fall back to the full ring for tiny islands
+    if len(points) < 4:
+        points = [[round(lon, precision), round(lat, precision)] for lon, lat in ring]
+    return points
+
+
+def simplify_geometry(geometry, step, precision):
+    if geometry['type'] == 'Polygon':
+        coordinates = [simplify_ring(ring, step, precision) for ring in geometry['coordinates']]
+    else:
+        coordinates = [[simplify_ring(ring, step, precision) for ring in polygon]
+                       for polygon in geometry['coordinates']]
+    return {'type': geometry['type'], 'coordinates': coordinates}
+
+
+@lru_cache(maxsize=None)
+def countries_at(resolution, precision):
+    """ All country outlines at a resolution level with coordinates rounded to the given number of decimals """
+    countries = load_countries()
+    step = resolutions[resolution]
+    return [
+        {
+            'type': 'Feature',
+            'id': feature['properties']['ISO_A3'],
+            'properties': {'ISO_A3': feature['properties']['ISO_A3']},
+            'geometry': simplify_geometry(feature['geometry'], step, precision)
+        }
+        for feature in countries['features']
+    ]
+
+
+def countries_geojson(codes, resolution=geometry_resolution, precision=geometry_precision):
+    """ GeoJSON with only the countries whose ISO_A3 code appears in codes """
+    codes = set(codes)
+    return {
+        'type': 'FeatureCollection',
+        'features': [feature for feature in countries_at(resolution, precision) if feature['id'] in codes]
+    }
@@ -2,21 +2,25 @@ import numpy as np
 import pandas as pd
 import plotly.graph_objects as go
 
+from plots.figure_cache import cache_figure
+from plots.trend import fit_lines, gdp_consumption_pairs
 from utils.decorator import style_plot
-import plotly.express as px
-from sklearn.linear_model import LinearRegression
+from utils.encoding import compact_figure
+from utils.metrics import timed
 
 
+@timed('figure')
+@cache_figure
+@compact_figure
 @style_plot
 def plot_avg_global_consumption(df):
     df_agg = df.groupby(["Year"]).mean().reset_index()
 
-    lr = LinearRegression()
-    lr.fit(df_agg['Year'].values.reshape(-1, 1), df_agg['consumption'])
+    slope, intercept, _, _ = fit_lines(df_agg['Year'], df_agg['consumption'])
 
     df_preds = pd.DataFrame(df_agg['Year'].copy())
 
-    df_preds['consumption'] = lr.predict(df_agg['Year'].values.reshape(-1, 1))
+    df_preds['consumption'] = slope[0] * df_agg['Year'] + intercept[0]
 
     fig = go.Figure()
 
@@ -29,7 +33,7 @@ def plot_avg_global_consumption(df):
                    name='Consumption')
     )
 
-    equation = f"Consumption = {lr.coef_[0]:.2f} * Year - {abs(lr.intercept_):.2f}"
+    equation = f"Consumption = {slope[0]:.2f} * Year - {abs(intercept[0]):.2f}"
 
     fig.add_annotation(
         x=1994,
@@ -63,6 +67,9 @@ def plot_avg_global_consumption(df):
     return fig
 
 
+@timed('figure')
+@cache_figure
+@compact_figure
 @style_plot
 def plot_sustainability(df):
     df_world = df[df["Entity"] == "World"]
@@ -102,13 +109,15 @@ def plot_sustainability(df):
     return fig
 
 
+@timed('figure')
+@cache_figure
+@compact_figure
 @style_plot
 def plot_fishing_type(df, country):
-    methods = ['longline', 'gillnet', 'small_scale', 'purse_seine', 'pelagic trawl', 'bottom_trawl', 'gear']
+    """ df has the rows of the country in the fishing_type_entities store """
+    import plotly.express as px
 
-    df_plot = pd.melt(df.reset_index(), ['Year', 'Entity'], methods, var_name='Fishing Type', value_name='Tonnes')
-
-    fig = px.area(df_plot.query(f'Entity == "{country}"'), x='Year', y='Tonnes', color='Fishing Type')
+    fig = px.area(df, x='Year', y='Tonnes', color='Fishing Type')
 
     fig.update_layout(
         title=dict(
@@ -125,23 +134,45 @@ def plot_fishing_type(df, country):
     return fig
 
 
+@timed('figure')
+@cache_figure
+@compact_figure
 @style_plot
-def plot_gdp_cons(df_gdp, df_cons):
-    df_gdp = df_gdp.query('["Norway", "China"] in `Country Name`')
+def plot_gdp_cons(df_gdp, df_cons, trends):
+    import plotly.express as px
 
-    df_plot = pd.merge(df_gdp,
-                       df_cons.rename({'Code': 'Country Code'}, axis=1)[['consumption', 'Country Code', 'Year']],
-                       on=['Country Code', 'Year'])
+    df_plot = gdp_consumption_pairs(df_gdp, df_cons)
 
     fig = px.scatter(df_plot,
                      x='gdp_pr_capita',
                      y='consumption',
                      color='Country Code',
                      log_x=True,
-                     hover_name='Year',
-                     trendline='ols',
-                     trendline_options=dict(log_x=True),
-                     trendline_scope='overall')
+                     hover_name='Year')
+
+    # One trend over both countries, fitted against log10 of GDP like the log x axis
+    df_trend = df_plot.dropna(subset=['gdp_pr_capita', 'consumption']).sort_values('gdp_pr_capita')
+    slope, intercept, r2, _ = fit_lines(np.log10(df_trend['gdp_pr_capita']), df_trend['consumption'])
+    fig.add_trace(go.Scatter(x=df_trend['gdp_pr_capita'],
+                             y=slope[0] * np.log10(df_trend['gdp_pr_capita']) + intercept[0],
+                             mode='lines',
+                             name='Overall Trendline',
+                             hovertemplate=f'<b>OLS trendline</b><br>consumption = {slope[0]:g} * log10(gdp_pr_capita)'
+                                           f' + {intercept[0]:g}<br>R<sup>2</sup>={r2[0]:g}<br><br>'
+                                           'gdp_pr_capita=%{x}<br>consumption=%{y} <b>(trend)</b><extra></extra>'))
+
+    # The trend of every country shown, from the fits of all countries against log10 of GDP
+    for trace in [trace for trace in fig.data if trace.name in trends.index]:
+        fit = trends.loc[trace.name]
+        gdp = df_plot.loc[df_plot['Country Code'] == trace.name, 'gdp_pr_capita'].dropna().sort_values()
+        fig.add_trace(go.Scatter(x=gdp,
+                                 y=fit['slope'] * np.log10(gdp) + fit['intercept'],
+                                 mode='lines',
+                                 name=f'{trace.name} Trendline',
+                                 line=dict(color=trace.marker.color, dash='dash'),
+                                 hovertemplate=f'<b>{trace.name} OLS trendline</b><br>consumption = {fit["slope"]:g} * '
+                                               f'log10(gdp_pr_capita) + {fit["intercept"]:g}<br>'
+                                               f'R<sup>2</sup>={fit["r2"]:g}<extra></extra>'))
 
     df_plot['gdp_pr_capita_log'] = np.log(df_plot['gdp_pr_capita'])
     corr = df_plot[['gdp_pr_capita_log', 'consumption']].corr().iloc[0, 1]
@@ -173,8 +204,13 @@ def plot_gdp_cons(df_gdp, df_cons):
     return fig
 
 
+@timed('figure')
+@cache_figure
+@compact_figure
 @style_plot
 def plot_aquaculture_production(df):
+    import plotly.express as px
+
     fig = px.line(df,
                   x='Year',
                   y='Production pr capita',
@@ -186,7 +222,7 @@ def plot_aquaculture_production(df):
     fig.update_yaxes(matches=None)
 
     fig.update_layout(
-        title='Fish production types in China and Norway',
+        title=f'Fish production types in {" and ".join(df["Country"].unique())}',
         xaxis=dict(
             title='Year',
         ),
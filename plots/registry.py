@@ -0,0 +1,192 @@
+import argparse
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+import pandas as pd
+
+from utils.config import startup_workers
+
+
+def categorize(df):
+    """
+    Object columns as categoricals, holding integer codes and a single copy of every distinct string.
+    The other columns are not copied, so memory mapped columns stay mapped.
+
+    """
+    df = df.copy(deep=False)
+    for column in df.select_dtypes('object').columns:
+        df[column] = df[column].astype('category')
+    return df
+
+
+class DatasetRegistry:
+    """
+    Datasets registered by name and loaded on first access. Loaded datasets are kept for the
+    lifetime of the process until they are invalidated.
+
+    """
+
+    def __init__(self):
+        self.loaders = {}
+        self.requires = {}
+        self.sources = {}
+        self.cache = {}
+        self.load_times = {}
+        self.locks = defaultdict(threading.Lock)
+        self.recorders = []
+        # Called with the names of the dropped datasets after every invalidation, to clear what was built from them
+        self.invalidated = []
+
+    def register(self, name, loader, requires=(), sources=()):
+        """
+        Register a loader along with the datasets it reads, which preload loads before it, and the files besides
+        the module of the loader it is computed by, which plots/build.py hashes.
+
+        """
+        if name in self.loaders:
+            raise KeyError(f'Dataset {name} is already registered')
+        self.loaders[name] = loader
+        self.requires[name] = tuple(requires)
+        self.sources[name] = tuple(sources)
+
+    @contextmanager
+    def recording(self):
+        """ Collect the names of the datasets accessed inside the block """
+        names = set()
+        self.recorders.append(names)
+        try:
+            yield names
+        finally:
+            self.recorders.remove(names)
+
+    def __getitem__(self, name):
+        for names in self.recorders:
+            names.add(name)
+        if name not in self.cache:
+            with self.locks[name]:
+                if name not in self.cache:
+                    start = time.perf_counter()
+                    self.cache[name] = self.loaders[name]()
+                    self.load_times[name] = time.perf_counter() - start
+        return self.cache[name]
+
+    def __contains__(self, name):
+        return name in self.loaders
+
+    def is_loaded(self, name):
+        return name in self.cache
+
+    def invalidate(self, *names):
+        """
+        Drop the given datasets and every dataset computed from them, or every dataset when no names are given,
+        so they are reloaded on next access
+
+        """
+        dropped = self.dependents(names) if names else list(self.loaders)
+        for name in dropped:
+            self.cache.pop(name, None)
+            self.load_times.pop(name, None)
+        for callback in self.invalidated:
+            callback(dropped)
+
+    def dependents(self, names):
+        """ The given datasets and every dataset requiring one of them, directly or through others """
+        return [name for name in self.with_requirements(list(self.loaders))
+                if any(required in names for required in self.with_requirements([name]))]
+
+    def with_requirements(self, names):
+        """ The given datasets and everything they require, each after its requirements """
+        ordered = []
+
+        def visit(name):
+            if name not in ordered:
+                for required in self.requires[name]:
+                    visit(required)
+                ordered.append(name)
+
+        for name in names:
+            visit(name)
+        return ordered
+
+    def preload(self, *names, workers=startup_workers):
+        """
+        Load the given datasets, or every registered dataset, on a thread pool. A dataset is started as soon
+        as the datasets it requires are loaded. Returns the start and end offset in seconds of every dataset
+        loaded, see critical_path and startup_report.
+
+        """
+        pending = [name for name in self.with_requirements(names or list(self.loaders)) if name not in self.cache]
+        timings = {}
+        start = time.perf_counter()
+
+        def load(name):
+            began = time.perf_counter() - start
+            self[name]
+            timings[name] = (began, time.perf_counter() - start)
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            running = {}
+            while pending or running:
+                for name in [name for name in pending if all(self.is_loaded(r) for r in self.requires[name])]:
+                    pending.remove(name)
+                    running[pool.submit(load, name)] = name
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    del running[future]
+                    future.result()
+        return timings
+
+    def critical_path(self, timings):
+        """ The chain of datasets, each waiting for the one before it, that ended last and bounds the preload """
+        path = [max(timings, key=lambda name: timings[name][1])]
+        while True:
+            required = [name for name in self.requires[path[-1]] if name in timings]
+            if not required:
+                return path[::-1]
+            path.append(max(required, key=lambda name: timings[name][1]))
+
+    def categorize(self):
+        """ Replace the loaded frames by categorical versions, so forked workers do not touch per-row string objects """
+        for name, value in self.cache.items():
+            if isinstance(value, pd.DataFrame):
+                self.cache[name] = categorize(value)
+
+
+def startup_report(registry, timings):
+    """ Lines with the timeline of a preload, its critical path and the time it saved over loading one by one """
+    lines = [f'{"dataset":<25} {"start":>7} {"end":>7} {"seconds":>8}  requires']
+    for name, (began, ended) in sorted(timings.items(), key=lambda item: item[1]):
+        lines.append(f'{name:<25} {began:7.3f} {ended:7.3f} {ended - began:8.3f}  {", ".join(registry.requires[name])}')
+
+    path = registry.critical_path(timings)
+    wall = max(ended for _, ended in timings.values())
+    serial = sum(ended - began for began, ended in timings.values())
+    lines.append(f'critical path: {" -> ".join(path)} '
+                 f'({sum(timings[name][1] - timings[name][0] for name in path):.3f}s)')
+    lines.append(f'wall {wall:.3f}s, one by one {serial:.3f}s')
+    return lines
+
+
+datasets = DatasetRegistry()
+
+
+def main():
+    import plots.data  # noqa: F401 - registers the loaders
+
+    parser = argparse.ArgumentParser(description='Load the datasets as at startup and report where the time goes')
+    parser.add_argument('names', nargs='*', help='datasets to load with their requirements, defaults to all')
+    parser.add_argument('--workers', type=int, default=startup_workers, help='threads loading datasets')
+    args = parser.parse_args()
+
+    timings = datasets.preload(*args.names, workers=args.workers)
+    print('\n'.join(startup_report(datasets, timings)))
+
+
+if __name__ == '__main__':
+    # Run the imported module, whose registries are the ones the other modules fill
+    import plots.registry
+
+    plots.registry.main()
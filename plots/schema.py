@@ -0,0 +1,183 @@
+import argparse
+import csv
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+except ImportError:
+    pa = None
+
+root = Path(__file__).parent.parent
+
+schemas = {}
+
+
+def arrow_type(dtype):
+    if dtype == 'category':
+        return pa.dictionary(pa.int32(), pa.string())
+    return pa.from_numpy_dtype(np.dtype(dtype))
+
+
+def read_arrow(path, dtypes):
+    """
+    Parse the columns in dtypes with the multithreaded Arrow CSV reader. Empty fields are missing values and
+    categories are sorted, as with pandas. Floats are correctly rounded, as with float_precision='round_trip'.
+
+    """
+    options = pa_csv.ConvertOptions(include_columns=list(dtypes), strings_can_be_null=True,
+                                    column_types={column: arrow_type(dtype) for column, dtype in dtypes.items()
+                                                  if dtype is not None})
+    df = pa_csv.read_csv(path, convert_options=options).to_pandas()
+    for column in df.select_dtypes('category').columns:
+        df[column] = df[column].cat.reorder_categories(sorted(df[column].cat.categories))
+    return df
+
+
+class Schema:
+    """
+    The columns of a CSV in data/ that the loaders use, with their dtypes and the names they are given.
+    Columns that are not listed are never parsed.
+
+    """
+
+    def __init__(self, path, columns, renames=None, years=None):
+        # Maps every column read to its dtype, None leaves the dtype to the parser
+        self.path = path
+        self.columns = columns
+        self.renames = renames or {}
+        # dtype of the one column per year of wide tables, those columns are read without being listed
+        self.years = years
+
+    def header(self):
+        with open(root / self.path, encoding='utf-8-sig', newline='') as file:
+            return next(csv.reader(file))
+
+    def dtypes(self):
+        """ dtype of every column read, in the order of the file """
+        return {column: self.years if column.isdigit() and self.years is not None else self.columns[column]
+                for column in self.header()
+                if column in self.columns or (column.isdigit() and self.years is not None)}
+
+    def read(self):
+        dtypes = self.dtypes()
+        if pa is not None:
+            df = read_arrow(root / self.path, dtypes)
+        else:
+            df = pd.read_csv(root / self.path, usecols=list(dtypes), float_precision='round_trip',
+                             dtype={column: dtype for column, dtype in dtypes.items() if dtype is not None})
+        return df.rename(columns=self.renames)
+
+
+def register(path, columns, renames=None, years=None):
+    if path in schemas:
+        raise KeyError(f'A schema for {path} is already registered')
+    schemas[path] = Schema(path, columns, renames, years)
+
+
+def read_csv(path):
+    """ Read a CSV in data/ through its schema """
+    return schemas[path].read()
+
+
+register('data/country_code_map.csv', {'Country': None, 'Alpha-3 code': None})
+
+register('data/population_total.csv', {'Country Name': 'category', 'Country Code': 'category'}, years='float64')
+
+register('data/country_gdp.csv', {'Country Name': 'category', 'Country Code': 'category'}, years='float64')
+
+register('data/FAOSTAT_country_supply_production_import_export.csv',
+         {'Area': 'category', 'Element': 'category', 'Year': 'int16', 'Value': 'float64'})
+
+register('data/fish-and-seafood-consumption-per-capita.csv',
+         {'Entity': 'category', 'Code': 'category', 'Year': 'int16',
+          'Fish, Seafood- Food supply quantity (kg/capita/yr) (FAO, 2020)': 'float64',
+          # Not used by the app, but the explainer notebook drops it from get_consumption
+          'TotalC': 'float64'},
+         renames={'Fish, Seafood- Food supply quantity (kg/capita/yr) (FAO, 2020)': 'consumption',
+                  'Entity': 'country'})
+
+register('data/fish-stocks-within-sustainable-levels.csv',
+         {'Entity': 'category', 'Year': 'int16',
+          'Share of fish stocks within biologically sustainable levels (FAO, 2020)': 'float64',
+          'Share of fish stocks that are overexploited': 'float64'},
+         renames={'Share of fish stocks within biologically sustainable levels (FAO, 2020)': 'sustainable',
+                  'Share of fish stocks that are overexploited': 'overexploited'})
+
+register('data/fish-catch-gear-type.csv',
+         {'Entity': 'category', 'Year': 'int16', 'unknown_gear': 'float64', 'other_gear': 'float64',
+          'longline': 'float64', 'gillnet': 'float64', 'small_scale': 'float64', 'purse_seine': 'float64',
+          'pelagic trawl': 'float64', 'bottom_trawl': 'float64'})
+
+register('data/ghg-per-protein-poore.csv',
+         {'Entity': 'category', 'GHG emissions per 100g protein (Poore & Nemecek, 2018)': 'float64'},
+         renames={'GHG emissions per 100g protein (Poore & Nemecek, 2018)': 'Emissions',
+                  'Entity': 'Protein source'})
+
+register('data/animal-protein-consumption.csv',
+         {'Entity': 'category', 'Year': 'int16', 'Poultry': 'float64', 'Pork': 'float64', 'Beef': 'float64',
+          'Lamb & goat': 'float64', 'Eggs': 'float64', 'Milk': 'float64', 'Fish, Seafood': 'float64'})
+
+register('data/capture-fisheries-vs-aquaculture.csv',
+         {'Entity': 'category', 'Year': 'int16', 'Aquaculture production (metric tons)': 'float64',
+          'Capture fisheries production (metric tons)': 'float64'},
+         renames={'Aquaculture production (metric tons)': 'Aquaculture',
+                  'Capture fisheries production (metric tons)': 'Capture fisheries',
+                  'Entity': 'Country'})
+
+register('data/nitrogen-emissions-seafood.csv',
+         {'Entity': 'category', 'Nitrogen (kgN / t edible weight)': 'float64'},
+         renames={'Nitrogen (kgN / t edible weight)': 'Nitrogen'})
+
+register('data/phosphorous-emissions-seafood.csv',
+         {'Entity': 'category', 'Phosphorous (kgP / t edible weight)': 'float64'},
+         renames={'Phosphorous (kgP / t edible weight)': 'Phosphorous'})
+
+
+def measure(read, repeat):
+    """ Best parse time over repeat reads and the memory of the frame, strings included """
+    seconds = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        df = read()
+        seconds.append(time.perf_counter() - start)
+    return min(seconds), df.memory_usage(deep=True).sum(), len(df.columns)
+
+
+def report(paths, repeat=3):
+    """
+    Lines comparing a plain read_csv of every CSV with the read through its schema. The memory is what the schemas
+    save, parse times vary with the pyarrow version and the cores and the small files are slower through Arrow.
+
+    """
+    lines = [f'{"file":<55} {"columns":>9} {"parse ms":>17} {"memory MB":>17}']
+    totals = [0, 0, 0, 0]
+    for path in paths:
+        plain = measure(lambda: pd.read_csv(root / path), repeat)
+        schema = measure(schemas[path].read, repeat)
+        lines.append(f'{path:<55} {plain[2]:>4}->{schema[2]:<4} '
+                     f'{plain[0] * 1e3:7.1f}->{schema[0] * 1e3:<7.1f} {plain[1] / 1e6:7.2f}->{schema[1] / 1e6:<7.2f}')
+        totals = [total + value for total, value in zip(totals, [plain[0], schema[0], plain[1], schema[1]])]
+    lines.append(f'{"total":<55} {"":9} {totals[0] * 1e3:7.1f}->{totals[1] * 1e3:<7.1f} '
+                 f'{totals[2] / 1e6:7.2f}->{totals[3] / 1e6:<7.2f}')
+    return lines
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Parse time and memory of the CSVs in data/ with and without schemas')
+    parser.add_argument('paths', nargs='*', help='CSVs to report, defaults to every registered one')
+    parser.add_argument('--repeat', type=int, default=3, help='reads per file, the fastest is reported')
+    args = parser.parse_args()
+
+    print('\n'.join(report(args.paths or list(schemas), args.repeat)))
+
+
+if __name__ == '__main__':
+    # Run the imported module, whose registries are the ones the other modules fill
+    import plots.schema
+
+    plots.schema.main()
@@ -0,0 +1,181 @@
+import argparse
+import hashlib
+import inspect
+import os
+import time
+from functools import lru_cache, wraps
+from pathlib import Path
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+root = Path(__file__).parent.parent
+store_dir = root / 'build' / 'store'
+
+# Published versions of a dataset kept on disk, processes may still have older ones mapped
+keep_versions = 2
+
+loaders = {}
+
+
+def pointer_path(name):
+    return store_dir / f'{name}.current'
+
+
+def digest_path(name):
+    return store_dir / f'{name}.digest'
+
+
+@lru_cache(maxsize=None)
+def content_digest(path, mtime_ns, size):
+    return hashlib.sha1(Path(path).read_bytes()).hexdigest()
+
+
+def file_digest(path):
+    """ Hash of a file's content, computed again only when its modification time or size change """
+    stat = os.stat(path)
+    return content_digest(str(path), stat.st_mtime_ns, stat.st_size)
+
+
+def source_digest(name):
+    """ Hash of the content of every source of an artifact, None when one of them is missing """
+    sources = loaders[name]['sources']
+    if not all(source.exists() for source in sources):
+        return None
+    return hashlib.sha1(''.join(f'{source.relative_to(root).as_posix()}:{file_digest(source)}\n'
+                                for source in sources).encode()).hexdigest()
+
+
+def artifact_path(name):
+    """ The published version of an artifact, named by the pointer file written when it was compiled """
+    pointer = pointer_path(name)
+    if not pointer.exists():
+        return None
+    return store_dir / pointer.read_text().strip()
+
+
+def to_table(df):
+    """
+    Arrow table of a frame with float columns stored as plain values, NaN included. Without a validity bitmap
+    the columns convert back to pandas without a copy.
+
+    """
+    table = pa.Table.from_pandas(df)
+    for i, field in enumerate(table.schema):
+        if field.name in df and pa.types.is_floating(field.type) and table.column(i).null_count:
+            table = table.set_column(i, field, pa.array(df[field.name].to_numpy(), from_pandas=False))
+    return table
+
+
+def read_artifact(name):
+    """ Memory map the published artifact. Numeric columns reference the shared pages and are read only. """
+    with pa.memory_map(str(artifact_path(name))) as source:
+        table = pa.ipc.open_file(source).read_all()
+    return table.to_pandas(split_blocks=True)
+
+
+def publish(name, df, digest=None):
+    """
+    Write a new version of an artifact next to the old ones and swap the pointer to it. Processes that mapped an
+    older version keep reading it, everything opened after the swap sees the new one. The digest of the sources
+    it was built from is written last, so a reader never takes an older artifact for a fresh one.
+
+    """
+    store_dir.mkdir(parents=True, exist_ok=True)
+    table = to_table(df)
+    artifact = store_dir / f'{name}-{time.time_ns()}.arrow'
+    with pa.OSFile(str(artifact), 'wb') as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+
+    pointer = pointer_path(name)
+    swap = pointer.with_suffix('.swap')
+    swap.write_text(artifact.name)
+    os.replace(swap, pointer)
+
+    if digest is not None:
+        swap = store_dir / f'{name}.digest.swap'
+        swap.write_text(digest)
+        os.replace(swap, digest_path(name))
+
+    for old in sorted(store_dir.glob(f'{name}-*.arrow'), key=lambda path: path.stat().st_mtime)[:-keep_versions]:
+        old.unlink()
+    return artifact
+
+
+def is_fresh(name):
+    """
+    An artifact is fresh when it was built from the current content of every source file and the module
+    defining its loader
+
+    """
+    artifact = artifact_path(name)
+    if pa is None or artifact is None or not artifact.exists() or not digest_path(name).exists():
+        return False
+    return digest_path(name).read_text().strip() == source_digest(name)
+
+
+def stored(name, *sources):
+    """
+    Register a loader with the data store. Calls map the compiled artifact when it is fresh
+    and fall back to parsing the source CSVs otherwise.
+
+    """
+
+    def decorator(func):
+        loaders[name] = {
+            'loader': func,
+            'sources': [root / source for source in sources] + [Path(inspect.getsourcefile(func))]
+        }
+
+        @wraps(func)
+        def wrapper():
+            if is_fresh(name):
+                return read_artifact(name)
+            return func()
+
+        return wrapper
+
+    return decorator
+
+
+def compile_artifact(name):
+    digest = source_digest(name)
+    df = loaders[name]['loader']()
+    publish(name, df, digest)
+    return df
+
+
+def compile_all(names=None, force=False):
+    """ Run the loaders once and publish their cleaned results as Arrow artifacts """
+    if pa is None:
+        raise ImportError('Compiling the data store requires pyarrow')
+
+    for name in names or loaders:
+        if not force and is_fresh(name):
+            print(f'{name:<25} up to date')
+            continue
+
+        start = time.perf_counter()
+        df = compile_artifact(name)
+        print(f'{name:<25} {len(df):>8} rows  {time.perf_counter() - start:6.2f}s')
+
+
+def main():
+    import plots.data  # noqa: F401 - registers the loaders
+
+    parser = argparse.ArgumentParser(description='Compile the datasets in data/ into memory mapped Arrow artifacts')
+    parser.add_argument('names', nargs='*', help='datasets to compile, defaults to all')
+    parser.add_argument('--force', action='store_true', help='recompile fresh artifacts as well')
+    args = parser.parse_args()
+
+    compile_all(args.names, force=args.force)
+
+
+if __name__ == '__main__':
+    # Run the imported module, whose registries are the ones the other modules fill
+    import plots.store
+
+    plots.store.main()
@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+
+
+def fit_lines(x, y):
+    """
+    Least squares lines y = slope * x + intercept through every row of x and y at once, in closed form.
+    NaN in x or y marks a missing observation. Rows with fewer than two distinct x values get NaN.
+    Returns arrays of slope, intercept, r2 and the number of observations per row.
+
+    """
+    x, y = np.broadcast_arrays(np.atleast_2d(np.asarray(x, dtype=float)), np.atleast_2d(np.asarray(y, dtype=float)))
+    valid = ~(np.isnan(x) | np.isnan(y))
+    n = valid.sum(axis=1)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        x_mean = np.where(valid, x, 0).sum(axis=1) / n
+        y_mean = np.where(valid, y, 0).sum(axis=1) / n
+        dx = np.where(valid, x - x_mean[:, np.newaxis], 0)
+        dy = np.where(valid, y - y_mean[:, np.newaxis], 0)
+
+        sxx = (dx * dx).sum(axis=1)
+        sxy = (dx * dy).sum(axis=1)
+        syy = (dy * dy).sum(axis=1)
+
+        slope = sxy / sxx
+        intercept = y_mean - slope * x_mean
+        r2 = sxy ** 2 / (sxx * syy)
+
+    return slope, intercept, r2, n
+
+
+def fit_frame(x, y, index):
+    slope, intercept, r2, n = fit_lines(x, y)
+    return pd.DataFrame({'slope': slope, 'intercept': intercept, 'r2': r2, 'n': n}, index=index)
+
+
+def gdp_consumption_pairs(df_gdp, df_cons):
+    """ GDP per capita and consumption of the same country and year """
+    return pd.merge(df_gdp,
+                    df_cons.rename({'Code': 'Country Code'}, axis=1)[['consumption', 'Country Code', 'Year']],
+                    on=['Country Code', 'Year'])
+
+
+def gdp_consumption_trends(df_gdp, df_cons):
+    """ Trend of consumption against log10 GDP per capita for every country, indexed by country code """
+    df = gdp_consumption_pairs(df_gdp, df_cons)
+    df = df.assign(gdp_log=np.log10(df['gdp_pr_capita'].where(df['gdp_pr_capita'] > 0)))
+    x = df.pivot_table(index='Country Code', columns='Year', values='gdp_log', observed=True)
+    y = df.pivot_table(index='Country Code', columns='Year', values='consumption', observed=True).reindex_like(x)
+    return fit_frame(x.to_numpy(), y.to_numpy(), x.index)
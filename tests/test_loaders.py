@@ -0,0 +1,52 @@
+"""
+Run every loader on the CSVs in data/, bypassing the compiled artifacts, with the pandas and pyarrow pinned in
+requirements.txt. Install them with pip install -r tests/requirements.txt and run python -m pytest tests.
+
+"""
+import pytest
+
+import plots.data  # noqa: F401 - registers the loaders
+from plots import schema, store
+from plots.data import group_by_elements, industry_elements
+from plots.registry import datasets
+
+
+@pytest.fixture(params=['arrow', 'pandas'])
+def parsed(request, monkeypatch):
+    """ Datasets loaded from the CSVs, with the Arrow reader and with the pandas fallback """
+    if request.param == 'arrow' and schema.pa is None:
+        pytest.skip('pyarrow is not installed')
+    if request.param == 'pandas':
+        monkeypatch.setattr(schema, 'pa', None)
+    monkeypatch.setattr(store, 'is_fresh', lambda name: False)
+
+    datasets.invalidate(*datasets.loaders)
+    yield datasets
+    datasets.invalidate(*datasets.loaders)
+
+
+def test_every_dataset_loads(parsed):
+    for name in parsed.with_requirements(list(parsed.loaders)):
+        assert parsed[name] is not None, name
+
+
+def test_fishing_types_fill_only_gear_columns(parsed):
+    df = parsed['fishing_types']
+    assert df.drop(columns=['Entity']).notna().all().all()
+    assert df['Entity'].dtype == 'category'
+
+
+def test_consumption_by_year_has_only_observed_countries(parsed):
+    consumption = parsed['consumption']
+    pairs = consumption[['Code', 'country']].dropna().drop_duplicates()
+    df = parsed['consumption_by_year']
+    assert len(df) == len(pairs)
+    assert df.index.is_monotonic_increasing
+
+
+def test_group_by_elements_has_only_observed_countries(parsed):
+    df = parsed['industry']
+    for elements in industry_elements.values():
+        codes = df.query('Year == 2017 and Element in @elements')['Country Code'].unique()
+        result = group_by_elements(df, parsed['population'], elements, 2017)
+        assert set(result['Country Code']) <= set(codes)
@@ -0,0 +1,135 @@
+import gzip
+import importlib.util
+import json
+import time
+from pathlib import Path
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+from utils.config import asset_image_widths
+
+root = Path(__file__).parent.parent
+assets_dir = root / 'assets'
+build_dir = root / 'build' / 'assets'
+manifest_path = build_dir / 'manifest.json'
+
+# Asset suffixes worth shipping precompressed, images are already compressed
+compressible = {'.css', '.js', '.json', '.svg', '.ico', '.txt', '.html'}
+
+image_formats = {
+    'image/avif': ('avif', 'AVIF', {'quality': 55}),
+    'image/webp': ('webp', 'WEBP', {'quality': 75, 'method': 6}),
+}
+
+
+def image_support(fmt):
+    try:
+        from PIL import features
+    except ImportError:
+        return False
+    if fmt == 'AVIF' and not features.check('avif'):
+        try:
+            import pillow_avif  # noqa: F401 - registers the AVIF plugin on older Pillow
+        except ImportError:
+            return False
+        return True
+    return features.check(fmt.lower())
+
+
+def compress_asset(path):
+    """ Write gzip and, when available, brotli copies of an asset next to each other in the build folder """
+    data = path.read_bytes()
+    encodings = {'gzip': (f'{path.name}.gz', gzip.compress(data, compresslevel=9, mtime=0))}
+    if brotli is not None:
+        encodings['br'] = (f'{path.name}.br', brotli.compress(data, quality=11))
+
+    written = {}
+    for encoding, (name, compressed) in encodings.items():
+        if len(compressed) < len(data):
+            (build_dir / name).write_bytes(compressed)
+            written[encoding] = name
+    return written
+
+
+def resize_image(path, width):
+    """
+    Write the image scaled down to at most the given width as a progressive JPEG along with
+    every modern format Pillow can encode. Returns the variants by mimetype.
+
+    """
+    from PIL import Image
+
+    image = Image.open(path)
+    if image.width > width:
+        image = image.resize((width, round(image.height * width / image.width)), Image.LANCZOS)
+    image = image.convert('RGB')
+
+    variants = {'image/jpeg': path.name}
+    image.save(build_dir / path.name, 'JPEG', quality=80, optimize=True, progressive=True)
+
+    for mimetype, (suffix, fmt, options) in image_formats.items():
+        if not image_support(fmt):
+            print(f'{path.name:<25} skipping {suffix}, Pillow cannot encode it')
+            continue
+        name = f'{path.stem}.{suffix}'
+        image.save(build_dir / name, fmt, **options)
+        variants[mimetype] = name
+    return variants
+
+
+def build_assets():
+    """ Write right-sized image variants and precompressed copies of assets/ to build/assets with a manifest """
+    build_dir.mkdir(parents=True, exist_ok=True)
+    manifest = {}
+
+    for path in sorted(assets_dir.iterdir()):
+        start = time.perf_counter()
+        entry = {}
+        if path.name in asset_image_widths:
+            if importlib.util.find_spec('PIL') is None:
+                print(f'{path.name:<25} skipped, resizing images requires Pillow')
+                continue
+            entry['types'] = resize_image(path, asset_image_widths[path.name])
+        elif path.suffix in compressible:
+            entry['encodings'] = compress_asset(path)
+
+        if not any(entry.values()):
+            continue
+
+        manifest[path.name] = entry
+        sizes = ', '.join(f'{name} {(build_dir / name).stat().st_size / 1e3:.0f}KB'
+                          for variants in entry.values() for name in variants.values())
+        print(f'{path.name:<25} {path.stat().st_size / 1e3:>8.0f}KB -> {sizes}  {time.perf_counter() - start:.2f}s')
+
+    manifest_path.write_text(json.dumps(manifest, indent=2))
+    return manifest
+
+
+def load_manifest():
+    """ Built variants by asset, leaving out assets changed since the last build """
+    if not manifest_path.exists():
+        return {}
+
+    manifest = {}
+    for name, entry in json.loads(manifest_path.read_text()).items():
+        source = assets_dir / name
+        variants = [build_dir / variant for variants in entry.values() for variant in variants.values()]
+        if source.exists() and all(v.exists() and v.stat().st_mtime >= source.stat().st_mtime for v in variants):
+            manifest[name] = entry
+    return manifest
+
+
+def main():
+    if brotli is None:
+        print('brotli is not installed, only gzip copies are written')
+    build_assets()
+
+
+if __name__ == '__main__':
+    # Run the imported module, whose registries are the ones the other modules fill
+    import utils.assets
+
+    utils.assets.main()
@@ -0,0 +1,138 @@
+import gzip
+import hashlib
+import mimetypes
+import re
+import threading
+from collections import OrderedDict
+
+import flask
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+from utils.assets import build_dir, image_formats, load_manifest
+from utils.config import compress_min_bytes, compress_cache_bytes
+
+# Preferred first when the client accepts several
+encodings = ['br', 'gzip'] if brotli is not None else ['gzip']
+
+compressible = {'application/json', 'application/javascript', 'text/javascript', 'text/css', 'text/html',
+                'text/plain', 'image/svg+xml'}
+
+# Compressed bodies by (ETag or content digest, encoding), least recently used first
+compressed = OrderedDict()
+lock = threading.Lock()
+
+
+def accepted_encoding():
+    return flask.request.accept_encodings.best_match(encodings)
+
+
+def accepts_type(mimetype):
+    """ Only an explicit mimetype in the Accept header counts, a wildcard does not promise support for AVIF """
+    return any(value == mimetype and quality > 0 for value, quality in flask.request.accept_mimetypes)
+
+
+def compress(data, encoding):
+    if encoding == 'br':
+        return brotli.compress(data, quality=5)
+    return gzip.compress(data, compresslevel=6, mtime=0)
+
+
+def compress_cached(key, data, encoding):
+    """ Compress a body that repeats between requests, keeping only the compressed bytes under its key """
+    with lock:
+        body = compressed.get((key, encoding))
+        if body is not None:
+            compressed.move_to_end((key, encoding))
+            return body
+
+    body = compress(data, encoding)
+    with lock:
+        compressed[key, encoding] = body
+        while sum(len(kept) for kept in compressed.values()) > compress_cache_bytes and len(compressed) > 1:
+            compressed.popitem(last=False)
+    return body
+
+
+def strip_encoding_etag():
+    """
+    Compressed responses send their ETag with the encoding appended. Dash compares If-None-Match with the ETag of
+    the uncompressed bundle, so the suffix is removed before the request reaches it.
+
+    """
+    value = flask.request.environ.get('HTTP_IF_NONE_MATCH')
+    if value:
+        flask.request.environ['HTTP_IF_NONE_MATCH'] = re.sub(r'-(?:br|gzip)"', '"', value)
+
+
+def serve_precompressed(prefix, manifest):
+    """ Serve the built variant of an asset that best matches the Accept and Accept-Encoding headers """
+
+    def before_request():
+        if not flask.request.path.startswith(prefix):
+            return None
+        entry = manifest.get(flask.request.path[len(prefix):])
+        if entry is None:
+            return None
+
+        if 'types' in entry:
+            mimetype = next((t for t in image_formats if t in entry['types'] and accepts_type(t)), 'image/jpeg')
+            response = flask.send_file(build_dir / entry['types'][mimetype], mimetype=mimetype, conditional=True)
+            response.vary.add('Accept')
+            return response
+
+        encoding = flask.request.accept_encodings.best_match([e for e in ('br', 'gzip') if e in entry['encodings']])
+        if encoding is None:
+            return None
+        mimetype = mimetypes.guess_type(flask.request.path)[0] or 'application/octet-stream'
+        response = flask.send_file(build_dir / entry['encodings'][encoding], mimetype=mimetype, conditional=True)
+        response.headers['Content-Encoding'] = encoding
+        response.vary.add('Accept-Encoding')
+        return response
+
+    return before_request
+
+
+def compress_dynamic(repeated_paths, repeated_prefixes):
+    """
+    Compress layout, dependency, callback and bundle responses the client accepts an encoding for.
+    Responses to the repeated paths, or under the repeated prefixes, are compressed once per ETag or content.
+
+    """
+
+    def after_request(response):
+        if (response.status_code != 200 or response.direct_passthrough or 'Content-Encoding' in response.headers
+                or response.mimetype not in compressible):
+            return response
+
+        response.vary.add('Accept-Encoding')
+        encoding = accepted_encoding()
+        data = response.get_data()
+        if encoding is None or len(data) < compress_min_bytes:
+            return response
+
+        etag, weak = response.get_etag()
+        path = flask.request.path
+        if path in repeated_paths or path.startswith(repeated_prefixes):
+            response.set_data(compress_cached(etag or hashlib.sha1(data).hexdigest(), data, encoding))
+        else:
+            response.set_data(compress(data, encoding))
+        response.headers['Content-Encoding'] = encoding
+        if etag:
+            response.set_etag(f'{etag}-{encoding}', weak=weak)
+        return response
+
+    return after_request
+
+
+def compress_responses(app):
+    """ Serve built asset variants from build/assets and compress dynamic responses of the Dash app """
+    prefix = app.config.routes_pathname_prefix + app.config.assets_url_path.strip('/') + '/'
+    app.server.before_request(serve_precompressed(prefix, load_manifest()))
+    app.server.before_request(strip_encoding_etag)
+    routes = app.config.routes_pathname_prefix
+    app.server.after_request(compress_dynamic({routes, routes + '_dash-layout', routes + '_dash-dependencies'},
+                                              (routes + '_dash-component-suites/',)))
@@ -3,3 +3,57 @@ colors = {
     'text': '#e4e6eb'
 }
 font = '"Alata", sans-serif'
+
+
+# Countries the story compares, any entity of the datasets in plots/entities.py can be used
+story_countries = ['China', 'Norway']
+
+# Switch the industry maps in the browser from pre-shipped values instead of a server callback
+industry_clientside = True
+
+# Country outlines on the maps, see plots/geometry.py
+geometry_resolution = 'full'
+geometry_precision = 3
+
+# Ship the consumption map with one year and fetch the other years in batches while it plays
+consumption_streaming = True
+consumption_frame_batch = 5
+consumption_prefetch = 5
+
+# Measure the serialized size of every figure returned by an instrumented function for /metrics
+metrics_figure_bytes = True
+
+# Callback latency and response size quantiles are computed over this many recent calls
+callback_window = 500
+# Log callbacks slower than this many seconds with their triggering inputs, None to disable
+slow_callback_seconds = 1.0
+
+# Figures send display values like map colors with this many significant digits, None keeps full precision
+figure_significant_digits = 4
+# Encode numeric trace arrays as base64 typed arrays when the plotly.js served by Dash supports them
+figure_typed_arrays = True
+
+# Compress layout and callback responses and serve the variants written by `python -m utils.assets`
+response_compression = True
+# Responses smaller than this many bytes are sent as they are
+compress_min_bytes = 1024
+# Bytes of compressed layout, dependency and bundle responses kept per worker, callbacks are compressed every time.
+# A page load compresses about 1.5 MB of them per encoding.
+compress_cache_bytes = 8 * 1024 * 1024
+# Images in assets/ scaled down to at most this width by the asset build
+asset_image_widths = {'background.jpg': 1920}
+
+# Leave the section figures out of the initial layout and load each one once it is this many pixels below the viewport
+lazy_sections = True
+lazy_margin = 600
+# Milliseconds between the browser's checks for section figures nearing the viewport
+lazy_interval = 250
+
+# Load the async component bundles and plotly.js with the page instead of on demand, used by the static export
+eager_loading = False
+
+# Threads loading independent datasets concurrently at startup, 1 loads them one by one
+startup_workers = 4
+
+# Processes building the layout figures during preload and `figure_cache warm`, None for one per core
+figure_workers = None
@@ -1,7 +1,10 @@
+from functools import wraps
+
 from utils.config import colors, font
 
 
 def style_plot(func):
+    @wraps(func)
     def wrapper(*args, **kwargs):
         fig = func(*args, **kwargs)
 
@@ -0,0 +1,112 @@
+import base64
+import json
+from functools import lru_cache, wraps
+from pathlib import Path
+
+import numpy as np
+from dash import Dash, dcc
+
+from utils.config import figure_significant_digits, figure_typed_arrays
+
+# Trace attributes holding numeric arrays, the display only ones are rounded
+numeric_keys = {'x', 'y', 'z', 'lat', 'lon', 'customdata', 'values'}
+display_keys = {'z', 'customdata'}
+
+
+@lru_cache(maxsize=None)
+def plotlyjs_version():
+    """ Version of plotly.js that Dash serves to the browser """
+    if hasattr(Dash, '_setup_plotlyjs'):
+        from plotly.offline import get_plotlyjs_version
+
+        return get_plotlyjs_version()
+
+    info = json.loads((Path(dcc.__file__).parent / 'package-info.json').read_text())
+    return info['dependencies']['plotly.js-dist-min'].lstrip('^~')
+
+
+def typed_arrays_supported():
+    """ plotly.js decodes base64 typed arrays from version 2.28 """
+    if not figure_typed_arrays:
+        return False
+    major, minor = (int(part) for part in plotlyjs_version().split('.')[:2])
+    return (major, minor) >= (2, 28)
+
+
+def round_significant(array, digits):
+    finite = np.isfinite(array) & (array != 0)
+    magnitude = np.zeros_like(array)
+    magnitude[finite] = np.floor(np.log10(np.abs(array[finite])))
+    scale = 10.0 ** (digits - 1 - magnitude)
+    return np.round(array * scale) / scale
+
+
+def numeric_array(values):
+    """ values as an int or float array, None when they are not all numbers """
+    if isinstance(values, dict) or not isinstance(values, (list, tuple, np.ndarray)) or len(values) == 0:
+        return None
+    try:
+        array = np.asarray(values)
+        if array.dtype == object:
+            array = array.astype(float)
+    except (TypeError, ValueError):
+        return None
+    if array.dtype.kind not in 'iuf' or array.ndim > 2:
+        return None
+    return array
+
+
+def encode_array(values, display=False):
+    """ Round display values to the configured significant digits and encode the array as base64 when supported """
+    array = numeric_array(values)
+    if array is None:
+        return values
+
+    rounded = display and array.dtype.kind == 'f' and figure_significant_digits is not None
+    if rounded:
+        array = round_significant(array, figure_significant_digits)
+
+    if not typed_arrays_supported():
+        if array.dtype.kind == 'f':
+            return np.where(np.isnan(array), None, array).tolist()
+        return array.tolist()
+
+    if array.dtype.kind in 'iu' and np.abs(array).max() < 2 ** 31:
+        array = array.astype('<i4')
+    elif rounded and figure_significant_digits <= 6:
+        array = array.astype('<f4')
+    else:
+        array = array.astype('<f8')
+
+    encoded = {
+        'dtype': f'{array.dtype.kind}{array.dtype.itemsize}',
+        'bdata': base64.b64encode(array.tobytes()).decode()
+    }
+    if array.ndim == 2:
+        encoded['shape'] = f'{array.shape[0]},{array.shape[1]}'
+    return encoded
+
+
+def encode_traces(traces):
+    for trace in traces:
+        for key in numeric_keys & trace.keys():
+            trace[key] = encode_array(trace[key], display=key in display_keys)
+        if isinstance(trace.get('marker', {}).get('color'), list):
+            trace['marker']['color'] = encode_array(trace['marker']['color'], display=True)
+
+
+def compact_figure(func):
+    """
+    Serialize the figure to a dict with compact numeric arrays. Apply below cache_figure and above style_plot.
+
+    """
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        fig = json.loads(func(*args, **kwargs).to_json())
+        encode_traces(fig.get('data', []))
+        for frame in fig.get('frames', []):
+            encode_traces(frame.get('data', []))
+        return fig
+
+    return wrapper
@@ -0,0 +1,118 @@
+import argparse
+import json
+import re
+import shutil
+import time
+from pathlib import Path
+
+root = Path(__file__).parent.parent
+
+# Answers the renderer's requests for the layout and callbacks from the copies inlined in the page
+fetch_shim = """
+(function () {
+    const responses = {
+        '_dash-layout': document.getElementById('_dash-static-layout').textContent,
+        '_dash-dependencies': document.getElementById('_dash-static-dependencies').textContent
+    };
+    const fetch = window.fetch;
+    window.fetch = function (url) {
+        const name = String(url).split('?')[0].split('/').pop();
+        if (name in responses) {
+            return Promise.resolve(new Response(responses[name], {headers: {'Content-Type': 'application/json'}}));
+        }
+        return fetch.apply(this, arguments);
+    };
+})();
+"""
+
+
+def static_config():
+    """
+    Settings for a page without a server behind it: every callback runs in the browser, the consumption
+    map ships all of its years and every section figure is in the layout. Set before the app is imported.
+
+    """
+    from utils import config
+
+    config.industry_clientside = True
+    config.consumption_frame_batch = 10 ** 4
+    config.lazy_sections = False
+    config.eager_loading = True
+
+
+def inline_json(data):
+    return json.dumps(data, separators=(',', ':')).replace('</', '<\\/')
+
+
+def static_index(index, layout, dependencies):
+    """ The index page with relative urls, and the layout and callbacks inlined behind a fetch shim """
+    index = re.sub(r'((?:src|href)=")/', r'\1', index)
+    index = re.sub(r'\?m=[\d.]+', '', index)
+
+    def relative_config(match):
+        config = json.loads(match.group(2))
+        config['requests_pathname_prefix'] = './'
+        return match.group(1) + inline_json(config) + match.group(3)
+
+    index = re.sub(r'(<script id="_dash-config" type="application/json">)(.*?)(</script>)', relative_config, index,
+                   flags=re.DOTALL)
+
+    static = (f'<script id="_dash-static-layout" type="application/json">{inline_json(layout)}</script>\n'
+              f'<script id="_dash-static-dependencies" type="application/json">{inline_json(dependencies)}</script>\n'
+              f'<script>{fetch_shim}</script>\n')
+    return index.replace('<script id="_dash-renderer"', static + '<script id="_dash-renderer"', 1)
+
+
+def export(output):
+    """
+    Render the app through the Flask test client into a folder any static file server can serve,
+    or that can be opened from disk. Only the browser side callbacks are kept.
+
+    """
+    static_config()
+    import app
+
+    client = app.server.test_client()
+
+    def get(path):
+        response = client.get(path)
+        if response.status_code != 200:
+            raise RuntimeError(f'Exporting {path} failed with status {response.status_code}')
+        return response.get_data()
+
+    index = get('/').decode()
+    layout = json.loads(get('/_dash-layout'))
+    dependencies = [dependency for dependency in json.loads(get('/_dash-dependencies'))
+                    if dependency.get('clientside_function')]
+
+    shutil.rmtree(output, ignore_errors=True)
+    output.mkdir(parents=True)
+
+    assets = Path(app.app.config.assets_folder)
+    paths = set(re.findall(r'(?:src|href)="(/[^"?]+)', index))
+    paths |= {f'/assets/{path.relative_to(assets).as_posix()}' for path in assets.rglob('*') if path.is_file()}
+    for path in sorted(paths):
+        target = output / path.lstrip('/')
+        target.parent.mkdir(parents=True, exist_ok=True)
+        target.write_bytes(get(path))
+
+    (output / 'index.html').write_text(static_index(index, layout, dependencies), encoding='utf-8')
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Export the story as a static site')
+    parser.add_argument('--output', type=Path, default=root / 'build' / 'site')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    paths = export(args.output)
+    size = sum(path.stat().st_size for path in args.output.rglob('*') if path.is_file())
+    print(f'Exported {len(paths) + 1} files, {size / 1e6:.1f}MB, to {args.output} in {time.perf_counter() - start:.1f}s')
+
+
+if __name__ == '__main__':
+    # Run the imported module, whose registries are the ones the other modules fill
+    import utils.export
+
+    utils.export.main()
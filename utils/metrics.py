@@ -0,0 +1,178 @@
+import logging
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from functools import wraps
+
+import flask
+import numpy as np
+import pandas as pd
+from dash import callback_context
+from plotly.io.json import to_json_plotly
+
+from utils.config import metrics_figure_bytes, callback_window, slow_callback_seconds
+
+logger = logging.getLogger(__name__)
+
+lock = threading.Lock()
+metrics = defaultdict(lambda: {'calls': 0, 'seconds': 0.0, 'rows': 0, 'bytes': 0})
+started = time.time()
+
+# Most recent callback samples per (callback id, triggering input), the trigger 'all' holds every sample
+callback_samples = defaultdict(lambda: {
+    'body': deque(maxlen=callback_window),
+    'serialize': deque(maxlen=callback_window),
+    'bytes': deque(maxlen=callback_window)
+})
+quantiles = [0.5, 0.95, 0.99]
+
+
+def reset():
+    """ Forget the recorded metrics and restart the clock, so a forked worker does not report those of its parent """
+    global started
+    with lock:
+        metrics.clear()
+        callback_samples.clear()
+    started = time.time()
+
+
+def result_size(result):
+    """ Rows of a DataFrame result and serialized bytes of a figure result """
+    if isinstance(result, pd.DataFrame):
+        return len(result), 0
+    if metrics_figure_bytes and (hasattr(result, 'to_plotly_json') or isinstance(result, dict) and 'data' in result):
+        return 0, len(to_json_plotly(result))
+    return 0, 0
+
+
+def record(kind, name, seconds, result=None):
+    rows, size = result_size(result)
+    with lock:
+        entry = metrics[kind, name]
+        entry['calls'] += 1
+        entry['seconds'] += seconds
+        entry['rows'] += rows
+        entry['bytes'] += size
+
+
+def timed(kind):
+    """ Record call count, duration and result size of the decorated loader, plot builder or callback """
+
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            result = func(*args, **kwargs)
+            record(kind, func.__name__, time.perf_counter() - start, result)
+            return result
+
+        return wrapper
+
+    return decorator
+
+
+def traced_callback(func):
+    """ Time the body of a Dash callback apart from the serialization of its response, see trace_callbacks """
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        result = func(*args, **kwargs)
+        flask.g.callback_body_seconds = time.perf_counter() - start
+        flask.g.callback_triggered = callback_context.triggered
+        return result
+
+    return wrapper
+
+
+def start_callback_trace():
+    flask.g.request_start = time.perf_counter()
+
+
+def finish_callback_trace(response):
+    """
+    Record body time, the remaining request time spent serializing and compressing, and the size sent of a
+    callback response. Registered before utils/compression.py, so it runs after the response is compressed.
+
+    """
+    if flask.request.path.endswith('/_dash-update-component') and 'callback_body_seconds' in flask.g:
+        total = time.perf_counter() - flask.g.request_start
+        body = flask.g.callback_body_seconds
+        payload = flask.request.get_json(silent=True) or {}
+        callback = payload.get('output', 'unknown')
+        changed = payload.get('changedPropIds') or ['initial']
+        trigger = changed[0].split('.')[0]
+
+        with lock:
+            for key in [(callback, trigger), (callback, 'all')]:
+                samples = callback_samples[key]
+                samples['body'].append(body)
+                samples['serialize'].append(total - body)
+                samples['bytes'].append(response.calculate_content_length() or 0)
+
+        if slow_callback_seconds is not None and total > slow_callback_seconds:
+            logger.warning('Slow callback %s took %.3fs (body %.3fs, %d bytes), triggered by %s',
+                           callback, total, body, response.calculate_content_length() or 0,
+                           flask.g.callback_triggered)
+    return response
+
+
+def trace_callbacks(server):
+    server.before_request(start_callback_trace)
+    server.after_request(finish_callback_trace)
+
+
+def callback_summary_lines(worker):
+    with lock:
+        snapshot = {key: {field: list(values) for field, values in samples.items()}
+                    for key, samples in callback_samples.items()}
+
+    lines = []
+    for field, metric, description in [
+        ('body', 'fishing_callback_body_seconds', 'Time spent in the callback body'),
+        ('serialize', 'fishing_callback_serialize_seconds', 'Request time outside the callback body'),
+        ('bytes', 'fishing_callback_response_bytes', 'Size of the callback response'),
+    ]:
+        lines += [f'# HELP {metric} {description}, over the last {callback_window} calls', f'# TYPE {metric} summary']
+        for (callback, trigger), samples in sorted(snapshot.items()):
+            labels = f'callback="{callback}",trigger="{trigger}",worker="{worker}"'
+            values = samples[field]
+            lines += [
+                f'{metric}{{{labels},quantile="{q}"}} {value}'
+                for q, value in zip(quantiles, np.quantile(values, quantiles))
+            ]
+            lines += [f'{metric}_sum{{{labels}}} {sum(values)}', f'{metric}_count{{{labels}}} {len(values)}']
+    return lines
+
+
+def prometheus_text():
+    """ The recorded metrics of this worker in the Prometheus text exposition format """
+    worker = os.getpid()
+    series = [
+        ('calls', 'fishing_calls_total', 'counter', 'Number of calls'),
+        ('seconds', 'fishing_seconds_total', 'counter', 'Time spent in calls'),
+        ('rows', 'fishing_result_rows_total', 'counter', 'Rows of DataFrames returned'),
+        ('bytes', 'fishing_figure_bytes_total', 'counter', 'Serialized bytes of figures returned'),
+    ]
+
+    with lock:
+        snapshot = {key: dict(entry) for key, entry in metrics.items()}
+
+    lines = [
+        '# HELP fishing_process_start_time_seconds Start time of the worker since the epoch',
+        '# TYPE fishing_process_start_time_seconds gauge',
+        f'fishing_process_start_time_seconds{{worker="{worker}"}} {started}',
+    ]
+    for field, metric, metric_type, description in series:
+        lines += [f'# HELP {metric} {description}', f'# TYPE {metric} {metric_type}']
+        lines += [
+            f'{metric}{{kind="{kind}",name="{name}",worker="{worker}"}} {entry[field]}'
+            for (kind, name), entry in sorted(snapshot.items())
+        ]
+    lines += callback_summary_lines(worker)
+    return '\n'.join(lines) + '\n'
+
+
+def metrics_response():
+    return flask.Response(prometheus_text(), mimetype='text/plain; version=0.0.4')